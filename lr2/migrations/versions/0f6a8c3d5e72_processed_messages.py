@@ -0,0 +1,34 @@
+"""processed messages
+
+Revision ID: 0f6a8c3d5e72
+Revises: 7b1d4f0e2a93
+Create Date: 2026-10-18 17:12:48.935016
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0f6a8c3d5e72'
+down_revision: Union[str, Sequence[str], None] = '7b1d4f0e2a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('processed_messages',
+    sa.Column('message_id', sa.String(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('message_id')
+    )
+    op.create_index(op.f('ix_processed_messages_expires_at'), 'processed_messages', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_processed_messages_expires_at'), table_name='processed_messages')
+    op.drop_table('processed_messages')
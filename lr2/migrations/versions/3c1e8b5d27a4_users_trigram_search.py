@@ -0,0 +1,37 @@
+"""users trigram search
+
+Revision ID: 3c1e8b5d27a4
+Revises: 97ffcd96ec9f
+Create Date: 2026-10-18 11:04:17.582931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1e8b5d27a4'
+down_revision: Union[str, Sequence[str], None] = '97ffcd96ec9f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index(
+        'ix_users_username_trgm', 'users', ['username'], unique=False,
+        postgresql_using='gin', postgresql_ops={'username': 'gin_trgm_ops'},
+    )
+    op.create_index(
+        'ix_users_email_trgm', 'users', ['email'], unique=False,
+        postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_email_trgm', table_name='users')
+    op.drop_index('ix_users_username_trgm', table_name='users')
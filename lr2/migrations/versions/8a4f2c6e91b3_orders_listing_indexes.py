@@ -0,0 +1,30 @@
+"""orders listing indexes
+
+Revision ID: 8a4f2c6e91b3
+Revises: 5d9b3e7a0c21
+Create Date: 2026-10-18 15:46:02.114387
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a4f2c6e91b3'
+down_revision: Union[str, Sequence[str], None] = '5d9b3e7a0c21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_orders_user_id_created_at', 'orders', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_orders_status_created_at', 'orders', ['status', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_orders_status_created_at', table_name='orders')
+    op.drop_index('ix_orders_user_id_created_at', table_name='orders')
@@ -0,0 +1,28 @@
+"""users created_at id index
+
+Revision ID: 97ffcd96ec9f
+Revises: 4956a9d38d83
+Create Date: 2026-10-18 10:12:41.305118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '97ffcd96ec9f'
+down_revision: Union[str, Sequence[str], None] = '4956a9d38d83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_created_at_id', table_name='users')
@@ -0,0 +1,28 @@
+"""processed messages owner
+
+Revision ID: 9e3b6f1c4a07
+Revises: c4e81b7a2d59
+Create Date: 2026-10-18 20:12:47.518304
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e3b6f1c4a07'
+down_revision: Union[str, Sequence[str], None] = 'c4e81b7a2d59'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('processed_messages', sa.Column('owner', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('processed_messages', 'owner')
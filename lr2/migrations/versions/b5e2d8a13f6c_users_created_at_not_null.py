@@ -0,0 +1,33 @@
+"""users created_at not null
+
+Revision ID: b5e2d8a13f6c
+Revises: 9e3b6f1c4a07
+Create Date: 2026-10-18 21:04:12.640931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e2d8a13f6c'
+down_revision: Union[str, Sequence[str], None] = '9e3b6f1c4a07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Курсор (created_at, id) не доходит до строк с NULL: заполняем их
+    op.execute(
+        "UPDATE users SET created_at = COALESCE(updated_at, LOCALTIMESTAMP) "
+        "WHERE created_at IS NULL"
+    )
+    op.alter_column('users', 'created_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('users', 'created_at', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,28 @@
+"""products available
+
+Revision ID: c4e81b7a2d59
+Revises: 0f6a8c3d5e72
+Create Date: 2026-10-18 18:05:31.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e81b7a2d59'
+down_revision: Union[str, Sequence[str], None] = '0f6a8c3d5e72'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('available', sa.Boolean(), server_default=sa.text('true'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('products', 'available')
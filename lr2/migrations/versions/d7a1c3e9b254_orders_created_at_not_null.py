@@ -0,0 +1,30 @@
+"""orders created_at not null
+
+Revision ID: d7a1c3e9b254
+Revises: b5e2d8a13f6c
+Create Date: 2026-10-18 21:09:37.215804
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a1c3e9b254'
+down_revision: Union[str, Sequence[str], None] = 'b5e2d8a13f6c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Курсор (created_at, id) не доходит до строк с NULL: заполняем их
+    op.execute("UPDATE orders SET created_at = LOCALTIMESTAMP WHERE created_at IS NULL")
+    op.alter_column('orders', 'created_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('orders', 'created_at', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,47 @@
+"""foreign key indexes
+
+Revision ID: e2c7a9d4f618
+Revises: 8a4f2c6e91b3
+Create Date: 2026-10-18 16:09:55.640128
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2c7a9d4f618'
+down_revision: Union[str, Sequence[str], None] = '8a4f2c6e91b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# orders.user_id покрыт ведущей колонкой ix_orders_user_id_created_at,
+# order_products.order_id — первичным ключом (order_id, product_id)
+INDEXES = [
+    ('ix_addresses_user_id', 'addresses', ['user_id']),
+    ('ix_orders_address_id', 'orders', ['address_id']),
+    ('ix_order_products_product_id', 'order_products', ['product_id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY не блокирует запись, но не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns, unique=False,
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name, table_name=table,
+                postgresql_concurrently=True, if_exists=True,
+            )
@@ -0,0 +1,435 @@
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import aio_pika
+from aio_pika.abc import (
+    AbstractChannel,
+    AbstractIncomingMessage,
+    AbstractRobustConnection,
+)
+from broker import ORDER_EVENTS_QUEUE, RABBITMQ_URL, broker
+from database import DatabaseSettings, create_engine_from_settings
+from dedup import MessageDeduplicator, PostgresDedupStore, RedisDedupStore
+from dto.message_dto import OrderMessage, ProductMessage
+from faststream import FastStream
+from faststream.rabbit import RabbitMessage, RabbitQueue
+from message_codecs import UnsupportedMessageError, decode_message
+from product_cache import get_product_cache
+from pydantic import ValidationError
+from redis_client import close_redis, get_redis
+from repositories.unit_of_work import UnitOfWork
+from services.email_service import EmailService
+from services.order_service import OrderService
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+PRODUCT_QUEUE = "product"
+PRODUCT_BATCH_SIZE = int(os.getenv("PRODUCT_BATCH_SIZE", "500"))
+PRODUCT_FLUSH_INTERVAL = float(os.getenv("PRODUCT_FLUSH_INTERVAL", "0.2"))
+
+ORDER_QUEUE = "order"
+ORDER_BATCH_SIZE = int(os.getenv("ORDER_BATCH_SIZE", "500"))
+ORDER_FLUSH_INTERVAL = float(os.getenv("ORDER_FLUSH_INTERVAL", "0.2"))
+
+DEDUP_BACKEND = os.getenv("DEDUP_BACKEND", "redis")
+
+MESSAGE_MAX_ATTEMPTS = int(os.getenv("MESSAGE_MAX_ATTEMPTS", "3"))
+TRANSIENT_RETRY_DELAY = float(os.getenv("TRANSIENT_RETRY_DELAY", "1.0"))
+ATTEMPTS_HEADER = "x-attempts"
+ERROR_HEADER = "x-last-error"
+
+# Ошибки окружения: пачка здесь ни при чём, делить её бессмысленно
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, ConnectionError, TimeoutError)
+
+FailedMessages = List[Tuple[AbstractIncomingMessage, Exception]]
+# Обработчик может вернуть сообщения, которые сейчас записать нельзя
+BatchHandler = Callable[
+    [List[AbstractIncomingMessage]], Awaitable[Optional[FailedMessages]]
+]
+
+app = FastStream(broker)
+email_service = EmailService()
+
+
+async def decode_event(message: RabbitMessage) -> List[Any]:
+    """Декодер FastStream: тело разбирается по content-type
+
+    Возвращает список событий: конверт encode_batch несёт их несколько.
+    """
+    return decode_message(
+        message.body,
+        message.content_type,
+        message.raw_message.content_encoding,
+        message.headers,
+    )
+
+
+@broker.subscriber(RabbitQueue(ORDER_EVENTS_QUEUE, durable=True), decoder=decode_event)
+async def send_order_emails(events: List[Dict[str, Any]]) -> None:
+    """Разослать письма по каждому событию доставки, в том числе из конверта"""
+    for event in events:
+        await send_order_email(event)
+
+
+async def send_order_email(event: Dict[str, Any]) -> None:
+    """Письмо об отправке заказа вне HTTP-запроса"""
+    if event["event_type"] != "order.status_changed":
+        return
+
+    data = event["data"]
+    if data["status"] != "shipped" or not data.get("email"):
+        return
+
+    await email_service.send_order_shipped(
+        email=data["email"],
+        order_id=data["order_id"],
+        username=data.get("username") or "Customer",
+    )
+
+
+def decode_body(message: AbstractIncomingMessage) -> List[Any]:
+    return decode_message(
+        message.body, message.content_type, message.content_encoding, message.headers
+    )
+
+
+def is_transient(error: BaseException) -> bool:
+    if isinstance(error, DBAPIError) and error.connection_invalidated:
+        return True
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+def message_key(message: AbstractIncomingMessage) -> Optional[str]:
+    """Ключ дедупликации — только message_id AMQP
+
+    id в теле — это id товара или заказа: повторное сообщение с ним может
+    быть законным обновлением, а не повторной доставкой.
+    """
+    return message.message_id or None
+
+
+class MicroBatchConsumer:
+    """Консьюмер aio-pika, который обрабатывает сообщения пачками
+
+    Сообщения копятся в буфере до batch_size или flush_interval секунд,
+    затем обработчик получает всю пачку, и она подтверждается одним
+    ack(multiple=True) по последнему delivery tag. prefetch держит в полёте
+    запас в две пачки, чтобы брокер не ждал, пока пишется текущая. При
+    ошибке окружения (БД недоступна, обрыв соединения) пачка целиком
+    возвращается в очередь. Если же обработчик отверг данные, пачка делится
+    пополам, пока не останутся сообщения, которые не проходят и поодиночке:
+    они публикуются в конец очереди с увеличенным счётчиком попыток, а после
+    max_attempts — в очередь <queue>.dead-letter. Остальная пачка записывается.
+    Тем же путём идут сообщения, которые обработчик вернул как не записанные.
+    Сообщения, которые этот консьюмер не умеет разобрать (UnsupportedMessageError),
+    уходят в dead-letter сразу.
+
+    С dedup повторно доставленные сообщения отсеиваются до обработчика и
+    подтверждаются вместе с пачкой. Сообщения, которые ещё обрабатывает
+    другой консьюмер, возвращаются в очередь после паузы retry_delay:
+    подтверждать их нельзя, пока обработка не подтверждена.
+    """
+
+    def __init__(
+        self,
+        queue: str,
+        handler: BatchHandler,
+        batch_size: int = 500,
+        flush_interval: float = 0.2,
+        prefetch: Optional[int] = None,
+        url: str = RABBITMQ_URL,
+        dedup: Optional[MessageDeduplicator] = None,
+        key: Callable[[AbstractIncomingMessage], Optional[str]] = message_key,
+        max_attempts: int = MESSAGE_MAX_ATTEMPTS,
+        retry_delay: float = TRANSIENT_RETRY_DELAY,
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.prefetch = prefetch or batch_size * 2
+        self.url = url
+        self.dedup = dedup
+        self.key = key
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.dead_letter_queue = f"{queue}.dead-letter"
+        self._buffer: List[AbstractIncomingMessage] = []
+        self._first_at = 0.0
+        self._lock = asyncio.Lock()
+        self._connection: Optional[AbstractRobustConnection] = None
+        self._channel: Optional[AbstractChannel] = None
+        self._timer: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._connection = await aio_pika.connect_robust(self.url)
+        self._channel = await self._connection.channel()
+        await self._channel.set_qos(prefetch_count=self.prefetch)
+        queue = await self._channel.declare_queue(self.queue, durable=True)
+        await self._channel.declare_queue(self.dead_letter_queue, durable=True)
+        await queue.consume(self._on_message)
+        self._timer = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            try:
+                await self._timer
+            except asyncio.CancelledError:
+                pass
+            self._timer = None
+        await self.flush()
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    async def _on_message(self, message: AbstractIncomingMessage) -> None:
+        if not self._buffer:
+            self._first_at = time.monotonic()
+        self._buffer.append(message)
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval / 2)
+            if (
+                self._buffer
+                and time.monotonic() - self._first_at >= self.flush_interval
+            ):
+                await self.flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._buffer:
+                return
+            batch, self._buffer = self._buffer, []
+            fresh, claimed, busy = await self._drop_duplicates(batch)
+            try:
+                failed = await self._handle(fresh)
+                for message, error in failed:
+                    await self._retry_later(message, error)
+            except Exception as e:
+                print(f"Пачка из {len(batch)} сообщений {self.queue} не записана: {e}")
+                if self.dedup:
+                    await self.dedup.release(claimed)
+                # Пауза, чтобы при недоступной БД не гонять пачку по кругу
+                await asyncio.sleep(self.retry_delay)
+                await batch[-1].nack(multiple=True, requeue=True)
+                return
+
+            if self.dedup:
+                # Копии отложенных сообщений должны пройти отсев повторов
+                retried = {self.key(message) for message, _ in failed}
+                await self.dedup.release(claimed & retried)
+                await self.dedup.confirm(claimed - retried)
+            await self._settle(batch, busy)
+
+    async def _settle(
+        self, batch: List[AbstractIncomingMessage], busy: List[AbstractIncomingMessage]
+    ) -> None:
+        """Остальное — одним ack, занятые другим консьюмером — в очередь"""
+        busy_ids = {id(message) for message in busy}
+        done = [message for message in batch if id(message) not in busy_ids]
+        if done:
+            await done[-1].ack(multiple=True)
+        if not busy:
+            return
+        # Брокер вернёт сообщение сразу: без паузы оно крутилось бы по кругу,
+        # пока владелец не закончит обработку или не истечёт его отметка
+        await asyncio.sleep(self.retry_delay)
+        for message in busy:
+            await message.nack(requeue=True)
+
+    async def _handle(self, messages: List[AbstractIncomingMessage]) -> FailedMessages:
+        """Записать сообщения, деля пачку пополам; вернуть не прошедшие поодиночке"""
+        if not messages:
+            return []
+        try:
+            return list(await self.handler(messages) or [])
+        except Exception as e:
+            if is_transient(e):
+                raise
+            if len(messages) == 1:
+                return [(messages[0], e)]
+            print(
+                f"Пачка из {len(messages)} сообщений {self.queue} отвергнута, "
+                f"делим пополам: {e}"
+            )
+        middle = len(messages) // 2
+        return await self._handle(messages[:middle]) + await self._handle(
+            messages[middle:]
+        )
+
+    async def _retry_later(
+        self, message: AbstractIncomingMessage, error: Exception
+    ) -> None:
+        """Копия в конец очереди или, после max_attempts, в dead-letter"""
+        headers = dict(message.headers or {})
+        attempts = int(headers.get(ATTEMPTS_HEADER, 0)) + 1
+        headers[ATTEMPTS_HEADER] = attempts
+        headers[ERROR_HEADER] = str(error)[:500]
+        # Повтор не поможет: такое сообщение разберёт только новая версия консьюмера
+        retry = attempts < self.max_attempts and not isinstance(
+            error, UnsupportedMessageError
+        )
+        target = self.queue if retry else self.dead_letter_queue
+        print(
+            f"Сообщение {message.message_id} не записано "
+            f"(попытка {attempts}), отправлено в {target}: {error}"
+        )
+        await self._channel.default_exchange.publish(
+            aio_pika.Message(
+                body=message.body,
+                headers=headers,
+                content_type=message.content_type,
+                content_encoding=message.content_encoding,
+                message_id=message.message_id,
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            ),
+            routing_key=target,
+        )
+
+    async def _drop_duplicates(
+        self, batch: List[AbstractIncomingMessage]
+    ) -> Tuple[List[AbstractIncomingMessage], Set[str], List[AbstractIncomingMessage]]:
+        """Новые сообщения, занятые ключи и сообщения в обработке у других"""
+        if not self.dedup:
+            return batch, set(), []
+        keys = [self.key(message) for message in batch]
+        claimed, busy_keys = await self.dedup.claim(
+            key for key in keys if key is not None
+        )
+        fresh = [
+            message
+            for message, key in zip(batch, keys)
+            if key is None or key in claimed
+        ]
+        busy = [message for message, key in zip(batch, keys) if key in busy_keys]
+        return fresh, claimed, busy
+
+
+def parse_messages(batch: List[AbstractIncomingMessage], model) -> Dict[Any, Any]:
+    """Разобрать пачку; последнее сообщение с тем же id побеждает
+
+    Тело декодируется по content-type, конверт разворачивается в несколько
+    сообщений. Невалидные сообщения пропускаются: их подтвердит общий ack
+    пачки, иначе они бесконечно возвращались бы в очередь. Сообщения в
+    неизвестном формате или новой версии схемы не теряются: ошибка уходит
+    в MicroBatchConsumer, и он отправляет такое сообщение в dead-letter.
+    """
+    parsed = {}
+    for message in batch:
+        try:
+            values = decode_body(message)
+        except UnsupportedMessageError:
+            raise
+        except ValueError as e:
+            print(f"Пропущено невалидное сообщение {message.message_id}: {e}")
+            continue
+        for value in values:
+            try:
+                item = model.model_validate(value)
+            except (ValueError, ValidationError) as e:
+                print(f"Пропущено невалидное сообщение {message.message_id}: {e}")
+                continue
+            parsed[item.id] = item
+    return parsed
+
+
+def product_batch_handler(session_factory: async_sessionmaker) -> BatchHandler:
+    async def handle(batch: List[AbstractIncomingMessage]) -> None:
+        products = parse_messages(batch, ProductMessage)
+        if not products:
+            return
+        rows = [
+            {
+                "id": product.id,
+                "name": product.name,
+                "price": product.price,
+                "description": product.description,
+                "available": product.available,
+            }
+            for product in products.values()
+        ]
+        async with session_factory() as session:
+            async with UnitOfWork(session, product_cache=get_product_cache()) as uow:
+                await uow.products.upsert_many(rows)
+
+    return handle
+
+
+def order_batch_handler(session_factory: async_sessionmaker) -> BatchHandler:
+    """Пачка заказов пишется одной транзакцией; ack пачки — после commit"""
+
+    async def handle(batch: List[AbstractIncomingMessage]) -> FailedMessages:
+        orders, sources = {}, {}
+        for message in batch:
+            for order_id, order in parse_messages([message], OrderMessage).items():
+                orders[order_id] = order
+                sources[order_id] = message
+        if not orders:
+            return []
+        async with session_factory() as session:
+            uow = UnitOfWork(session)
+            service = OrderService(
+                uow.orders, uow.products, uow.users, unit_of_work=uow
+            )
+            inserted, rejected = await service.import_orders(list(orders.values()))
+        print(
+            f"Заказы: вставлено {inserted}, отложено {len(rejected)}, "
+            f"дублей {len(orders) - inserted - len(rejected)}"
+        )
+        # Товары и заказы идут разными очередями: заказ мог обогнать свой товар.
+        # Повтор конверта безопасен — уже вставленные заказы пропускаются
+        failed = {}
+        for order_id in rejected:
+            message = sources[order_id]
+            failed.setdefault(
+                id(message),
+                (message, LookupError(f"Заказ {order_id}: адрес или товар не найден")),
+            )
+        return list(failed.values())
+
+    return handle
+
+
+async def main() -> None:
+    engine = create_engine_from_settings(DatabaseSettings.from_env())
+    session_factory = async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+    if DEDUP_BACKEND == "postgres":
+        dedup_store = PostgresDedupStore(session_factory)
+    else:
+        dedup_store = RedisDedupStore(get_redis())
+
+    product_consumer = MicroBatchConsumer(
+        PRODUCT_QUEUE,
+        product_batch_handler(session_factory),
+        batch_size=PRODUCT_BATCH_SIZE,
+        flush_interval=PRODUCT_FLUSH_INTERVAL,
+        dedup=MessageDeduplicator(dedup_store),
+    )
+    order_consumer = MicroBatchConsumer(
+        ORDER_QUEUE,
+        order_batch_handler(session_factory),
+        batch_size=ORDER_BATCH_SIZE,
+        flush_interval=ORDER_FLUSH_INTERVAL,
+        dedup=MessageDeduplicator(dedup_store),
+    )
+    await product_consumer.start()
+    await order_consumer.start()
+    try:
+        await app.run()
+    finally:
+        await order_consumer.stop()
+        await product_consumer.stop()
+        await close_redis()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+from typing import Optional
+from uuid import UUID
+
+from export import ExportFormat, export_stream
+from litestar import Controller, get
+from litestar.params import Parameter
+from litestar.response import Stream
+from repositories.order_repository import OrderRepository
+from repositories.product_repository import ProductRepository
+from repositories.user_repository import UserRepository
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+
+def _column_names(columns) -> list:
+    return [column.key for column in columns]
+
+
+class ExportController(Controller):
+    path = "/export"
+
+    @get("/users")
+    async def export_users(
+        self,
+        session_factory: async_sessionmaker,
+        fmt: ExportFormat = Parameter(query="format", default="ndjson"),
+        batch_size: int = Parameter(default=1000, ge=1, le=10000),
+    ) -> Stream:
+        """Выгрузить всех пользователей в NDJSON или CSV"""
+        return export_stream(
+            session_factory,
+            lambda session: UserRepository(session).stream_all(batch_size),
+            _column_names(UserRepository.LIST_COLUMNS),
+            fmt,
+            "users",
+        )
+
+    @get("/products")
+    async def export_products(
+        self,
+        session_factory: async_sessionmaker,
+        fmt: ExportFormat = Parameter(query="format", default="ndjson"),
+        batch_size: int = Parameter(default=1000, ge=1, le=10000),
+    ) -> Stream:
+        """Выгрузить все товары в NDJSON или CSV"""
+        return export_stream(
+            session_factory,
+            lambda session: ProductRepository(session).stream_all(batch_size),
+            _column_names(ProductRepository.EXPORT_COLUMNS),
+            fmt,
+            "products",
+        )
+
+    @get("/orders")
+    async def export_orders(
+        self,
+        session_factory: async_sessionmaker,
+        user_id: Optional[UUID] = None,
+        fmt: ExportFormat = Parameter(query="format", default="ndjson"),
+        batch_size: int = Parameter(default=1000, ge=1, le=10000),
+    ) -> Stream:
+        """Выгрузить заказы (все или одного пользователя) в NDJSON или CSV"""
+        return export_stream(
+            session_factory,
+            lambda session: OrderRepository(session).stream_all(batch_size, user_id),
+            _column_names(OrderRepository.EXPORT_COLUMNS),
+            fmt,
+            "orders",
+        )
@@ -0,0 +1,18 @@
+from typing import Any, Dict
+
+from litestar import Controller, get
+from metrics import outbox_metrics, pool_metrics
+from product_cache import get_product_cache
+
+
+class MetricsController(Controller):
+    path = "/metrics"
+
+    @get()
+    async def get_metrics(self) -> Dict[str, Any]:
+        """Счётчики пула соединений, кэша товаров и relay outbox"""
+        return {
+            "db_pool": pool_metrics.snapshot(),
+            "product_cache": get_product_cache().stats(),
+            "outbox": outbox_metrics.snapshot(),
+        }
@@ -0,0 +1,46 @@
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from dto.order_dto import OrderResponse, OrdersResponse
+from litestar import Controller, get
+from litestar.exceptions import ValidationException
+from litestar.params import Parameter
+from pagination import InvalidCursorError
+from services.order_service import OrderService
+
+MAX_PAGE_SIZE = 100
+
+
+class OrderController(Controller):
+    path = "/orders"
+
+    @get()
+    async def get_orders(
+        self,
+        order_service: OrderService,
+        count: int = Parameter(default=20, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        user_id: Optional[UUID] = None,
+        status: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> OrdersResponse:
+        """Получить заказы по пользователю, статусу и периоду с курсорной пагинацией"""
+        try:
+            orders, next_cursor = await order_service.list_orders(
+                count,
+                cursor,
+                user_id=user_id,
+                status=status,
+                created_from=created_from,
+                created_to=created_to,
+            )
+        except InvalidCursorError as e:
+            raise ValidationException(detail=str(e)) from e
+
+        return OrdersResponse(
+            orders=[OrderResponse.model_validate(order) for order in orders],
+            page_size=count,
+            next_cursor=next_cursor,
+        )
@@ -1,13 +1,23 @@
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 
-from dto.user_dto import UserCreate, UserResponse, UsersResponse, UserUpdate
+from dto.user_dto import (
+    UserCreate,
+    UserListItem,
+    UserResponse,
+    UsersResponse,
+    UserUpdate,
+    to_user_items,
+)
 from litestar import Controller, delete, get, post, put
 from litestar.enums import RequestEncodingType
-from litestar.exceptions import NotFoundException
-from litestar.params import Body
+from litestar.exceptions import NotFoundException, ValidationException
+from litestar.params import Body, Parameter
+from pagination import InvalidCursorError
 from services.user_service import UserService
 
+MAX_PAGE_SIZE = 100
+
 
 class UserController(Controller):
     path = "/users"
@@ -28,10 +38,14 @@ class UserController(Controller):
     async def get_all_users(
         self,
         user_service: UserService,
-        count: int = 10,
-        page: int = 1,
+        count: int = Parameter(default=10, ge=1, le=MAX_PAGE_SIZE),
+        page: int = Parameter(default=1, ge=1),
         username: Optional[str] = None,
         email: Optional[str] = None,
+        cursor: Optional[str] = None,
+        keyset: bool = False,
+        include_total: bool = True,
+        estimate_total: bool = False,
     ) -> UsersResponse:
         """Получить список пользователей с пагинацией и общим количеством"""
         filters = {}
@@ -40,20 +54,47 @@ class UserController(Controller):
         if email:
             filters["email"] = email
 
+        if keyset or cursor:
+            try:
+                users, next_cursor = await user_service.get_by_keyset(
+                    count, cursor, **filters
+                )
+            except InvalidCursorError as e:
+                raise ValidationException(detail=str(e)) from e
+
+            return UsersResponse(
+                users=to_user_items(users),
+                page_size=count,
+                next_cursor=next_cursor,
+            )
+
         users, total_count = await user_service.get_by_filter_with_count(
-            count, page, **filters
+            count, page, include_total, estimate_total, **filters
         )
 
-        total_pages = (total_count + count - 1) // count if count > 0 else 1
+        total_pages = None
+        if total_count is not None:
+            total_pages = (total_count + count - 1) // count
 
         return UsersResponse(
-            users=[UserResponse.model_validate(user) for user in users],
+            users=to_user_items(users),
             total_count=total_count,
             page=page,
             page_size=count,
             total_pages=total_pages,
         )
 
+    @get("/search")
+    async def search_users(
+        self,
+        user_service: UserService,
+        q: str,
+        count: int = Parameter(default=10, ge=1, le=MAX_PAGE_SIZE),
+    ) -> List[UserListItem]:
+        """Нечёткий поиск пользователей по username и email"""
+        users = await user_service.search(q, count)
+        return to_user_items(users)
+
     @post()
     async def create_user(
         self,
@@ -0,0 +1,95 @@
+import itertools
+import time
+from typing import Sequence
+
+from litestar import Request
+from litestar.datastructures import Cookie, MutableScopeHeaders
+from litestar.types import Message, Scope
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+STICKY_COOKIE = "db_primary_until"
+WROTE_STATE_KEY = "db_wrote"
+REPLICA_INFO_KEY = "db_replica"
+
+
+def is_replica_session(session) -> bool:
+    """Сессия открыта на реплике: её данные могут отставать от primary"""
+    return bool(session.info.get(REPLICA_INFO_KEY))
+
+
+class SessionRouter:
+    """Выбор фабрики сессий: запись — в primary, чтение — по репликам по кругу
+
+    После записи клиент получает cookie, и до её истечения его чтения тоже
+    идут в primary, чтобы он видел собственные изменения несмотря на лаг реплик.
+    Сессии реплик помечены в session.info: общий кэш из них не заполняется,
+    иначе отстающая реплика вернула бы в него только что сброшенную запись.
+    """
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: Sequence[AsyncEngine] = (),
+        sticky_seconds: float = 5.0,
+    ):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.sticky_seconds = sticky_seconds
+        self.primary_factory = self._factory(primary)
+        self.replica_factories = [
+            self._factory(engine, replica=True) for engine in self.replicas
+        ]
+        self._replica_cycle = itertools.cycle(self.replica_factories)
+
+    @staticmethod
+    def _factory(engine: AsyncEngine, replica: bool = False) -> async_sessionmaker:
+        return async_sessionmaker(
+            engine,
+            class_=AsyncSession,
+            expire_on_commit=False,
+            info={REPLICA_INFO_KEY: replica},
+        )
+
+    def is_read_only(self, request: Request) -> bool:
+        if request.method not in READ_METHODS:
+            return False
+        if request.route_handler.opt.get("use_primary"):
+            return False
+        return not self._is_sticky(request)
+
+    def _is_sticky(self, request: Request) -> bool:
+        try:
+            return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def session_factory(self, request: Request) -> async_sessionmaker:
+        if self.replica_factories and self.is_read_only(request):
+            return next(self._replica_cycle)
+        if request.method not in READ_METHODS:
+            request.scope.setdefault("state", {})[WROTE_STATE_KEY] = True
+        return self.primary_factory
+
+    async def mark_primary_sticky(self, message: Message, scope: Scope) -> None:
+        """before_send-хук: после успешной записи закрепить клиента за primary"""
+        if message["type"] != "http.response.start":
+            return
+        if not self.replicas or message["status"] >= 400:
+            return
+        if not scope.get("state", {}).get(WROTE_STATE_KEY):
+            return
+
+        cookie = Cookie(
+            key=STICKY_COOKIE,
+            value=str(time.time() + self.sticky_seconds),
+            max_age=int(self.sticky_seconds) + 1,
+            httponly=True,
+        )
+        headers = MutableScopeHeaders.from_message(message)
+        headers.add("set-cookie", cookie.to_header(header=""))
+
+    async def dispose(self) -> None:
+        for engine in self.replicas:
+            await engine.dispose()
+        await self.primary.dispose()
@@ -0,0 +1,235 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Protocol, Set, Tuple
+
+from local_cache import LRUCache
+from models import ProcessedMessage
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import any_, bindparam, delete, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+DEDUP_WINDOW_SIZE = int(os.getenv("DEDUP_WINDOW_SIZE", "100000"))
+DEDUP_TTL = int(os.getenv("DEDUP_TTL", "86400"))
+DEDUP_PROCESSING_TTL = int(os.getenv("DEDUP_PROCESSING_TTL", "60"))
+
+STORE_ERRORS = (RedisError, SQLAlchemyError, OSError)
+
+
+class DedupStore(Protocol):
+    async def claim(
+        self, keys: List[str], ttl: int, owner: str
+    ) -> Tuple[Set[str], Set[str]]: ...
+
+    async def confirm(self, keys: List[str], ttl: int, owner: str) -> None: ...
+
+    async def release(self, keys: List[str], owner: str) -> None: ...
+
+
+class RedisDedupStore:
+    """Отметки в Redis: владелец на время обработки, затем done
+
+    Скрипты выполняются атомарно, одним round trip на пачку.
+    """
+
+    CLAIM_SCRIPT = """
+    local result = {}
+    for i, key in ipairs(KEYS) do
+        local value = redis.call('GET', key)
+        if not value or value == ARGV[1] then
+            redis.call('SET', key, ARGV[1], 'EX', ARGV[2])
+            result[i] = 1
+        elseif value == 'done' then
+            result[i] = 0
+        else
+            result[i] = 2
+        end
+    end
+    return result
+    """
+
+    RELEASE_SCRIPT = """
+    for _, key in ipairs(KEYS) do
+        if redis.call('GET', key) == ARGV[1] then
+            redis.call('DEL', key)
+        end
+    end
+    return 0
+    """
+
+    def __init__(self, redis: Redis, prefix: str = "dedup:"):
+        self.redis = redis
+        self.prefix = prefix
+        self._claim = redis.register_script(self.CLAIM_SCRIPT)
+        self._release = redis.register_script(self.RELEASE_SCRIPT)
+
+    async def claim(
+        self, keys: List[str], ttl: int, owner: str
+    ) -> Tuple[Set[str], Set[str]]:
+        results = await self._claim(
+            keys=[self.prefix + key for key in keys], args=[owner, ttl]
+        )
+        claimed = {key for key, state in zip(keys, results) if state == 1}
+        busy = {key for key, state in zip(keys, results) if state == 2}
+        return claimed, busy
+
+    async def confirm(self, keys: List[str], ttl: int, owner: str) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.set(self.prefix + key, "done", ex=ttl)
+            await pipe.execute()
+
+    async def release(self, keys: List[str], owner: str) -> None:
+        if keys:
+            await self._release(keys=[self.prefix + key for key in keys], args=[owner])
+
+
+class PostgresDedupStore:
+    """Отметки в таблице processed_messages, когда Redis не используется
+
+    Просроченная или своя отметка перехватывается тем же INSERT ... ON
+    CONFLICT, поэтому отдельная очистка нужна только для размера таблицы.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker):
+        self.session_factory = session_factory
+
+    @staticmethod
+    def _ids_param(keys: List[str]):
+        return bindparam("keys", keys, type_=ARRAY(ProcessedMessage.message_id.type))
+
+    async def claim(
+        self, keys: List[str], ttl: int, owner: str
+    ) -> Tuple[Set[str], Set[str]]:
+        now = datetime.now()
+        stmt = pg_insert(ProcessedMessage).values(
+            [
+                {
+                    "message_id": key,
+                    "owner": owner,
+                    "expires_at": now + timedelta(seconds=ttl),
+                }
+                for key in keys
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ProcessedMessage.message_id],
+            set_={"owner": stmt.excluded.owner, "expires_at": stmt.excluded.expires_at},
+            where=or_(
+                ProcessedMessage.expires_at < now, ProcessedMessage.owner == owner
+            ),
+        ).returning(ProcessedMessage.message_id)
+        async with self.session_factory() as session:
+            result = await session.execute(stmt)
+            claimed = set(result.scalars().all())
+            busy = set()
+            rest = [key for key in keys if key not in claimed]
+            if rest:
+                # Не перехваченные отметки живы: с владельцем — в обработке
+                result = await session.execute(
+                    select(ProcessedMessage.message_id).where(
+                        ProcessedMessage.message_id == any_(self._ids_param(rest)),
+                        ProcessedMessage.owner.is_not(None),
+                    )
+                )
+                busy = set(result.scalars().all())
+            await session.commit()
+        return claimed, busy
+
+    async def confirm(self, keys: List[str], ttl: int, owner: str) -> None:
+        stmt = (
+            update(ProcessedMessage)
+            .where(
+                ProcessedMessage.message_id == any_(self._ids_param(keys)),
+                ProcessedMessage.owner == owner,
+            )
+            .values(owner=None, expires_at=datetime.now() + timedelta(seconds=ttl))
+        )
+        async with self.session_factory() as session:
+            await session.execute(stmt)
+            await session.commit()
+
+    async def release(self, keys: List[str], owner: str) -> None:
+        if not keys:
+            return
+        stmt = delete(ProcessedMessage).where(
+            ProcessedMessage.message_id == any_(self._ids_param(keys)),
+            ProcessedMessage.owner == owner,
+        )
+        async with self.session_factory() as session:
+            await session.execute(stmt)
+            await session.commit()
+
+    async def purge_expired(self) -> int:
+        stmt = delete(ProcessedMessage).where(
+            ProcessedMessage.expires_at < datetime.now()
+        )
+        async with self.session_factory() as session:
+            result = await session.execute(stmt)
+            await session.commit()
+        return result.rowcount
+
+
+class MessageDeduplicator:
+    """Отсев повторно доставленных сообщений до записи в БД
+
+    claim() занимает id от имени этого экземпляра на processing_ttl секунд.
+    Дублем считается только подтверждённый id: после commit confirm()
+    помечает его обработанным на ttl и кладёт в локальное окно. Id, занятый
+    другим консьюмером и не подтверждённый, возвращается как busy: такое
+    сообщение нужно вернуть в очередь, а не подтверждать, иначе при падении
+    того консьюмера данные потеряются. Свою неподтверждённую отметку (обрыв
+    соединения, неудачный release) экземпляр перехватывает сразу. Повторы
+    из окна отсеиваются без обращения к хранилищу. При недоступном
+    хранилище все сообщения считаются новыми: запись в БД идемпотентна.
+    """
+
+    def __init__(
+        self,
+        store: DedupStore,
+        ttl: int = DEDUP_TTL,
+        processing_ttl: int = DEDUP_PROCESSING_TTL,
+        window: Optional[LRUCache] = None,
+    ):
+        self.store = store
+        self.ttl = ttl
+        self.processing_ttl = processing_ttl
+        self.window = window or LRUCache(maxsize=DEDUP_WINDOW_SIZE, ttl=ttl)
+        self.owner = uuid.uuid4().hex
+        self.duplicates = 0
+
+    async def claim(self, keys: Iterable[str]) -> Tuple[Set[str], Set[str]]:
+        """Занять новые id; вернуть (занятые, обрабатываемые другим консьюмером)"""
+        keys = list(dict.fromkeys(keys))
+        unseen = [key for key in keys if key not in self.window]
+        claimed, busy = set(), set()
+        if unseen:
+            try:
+                claimed, busy = await self.store.claim(
+                    unseen, self.processing_ttl, self.owner
+                )
+            except STORE_ERRORS as e:
+                print(f"Хранилище дедупликации недоступно: {e}")
+                claimed = set(unseen)
+        self.duplicates += len(keys) - len(claimed) - len(busy)
+        return claimed, busy
+
+    async def confirm(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        for key in keys:
+            self.window.set(key, True)
+        if keys:
+            try:
+                await self.store.confirm(keys, self.ttl, self.owner)
+            except STORE_ERRORS as e:
+                print(f"Не удалось продлить отметки дедупликации: {e}")
+
+    async def release(self, keys: Iterable[str]) -> None:
+        try:
+            await self.store.release(list(keys), self.owner)
+        except STORE_ERRORS as e:
+            print(f"Не удалось снять отметки дедупликации: {e}")
@@ -0,0 +1,32 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional
+from uuid import UUID
+
+from pydantic import BaseModel, Field
+
+
+class ProductMessage(BaseModel):
+    """Товар из очереди product (формат producer_pika.send_products)"""
+
+    id: UUID
+    name: str
+    price: Decimal
+    description: Optional[str] = None
+    available: bool = True
+
+
+class OrderItemMessage(BaseModel):
+    product_id: UUID
+    quantity: int = Field(gt=0)
+
+
+class OrderMessage(BaseModel):
+    """Заказ из очереди order (формат producer_pika.send_orders)"""
+
+    id: UUID
+    user_id: UUID
+    address_id: UUID
+    items: List[OrderItemMessage] = Field(min_length=1)
+    status: str = "pending"
+    created_at: datetime
@@ -0,0 +1,23 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional
+
+from pydantic import UUID4, BaseModel
+
+
+class OrderResponse(BaseModel):
+    id: UUID4
+    user_id: UUID4
+    address_id: UUID4
+    status: str
+    total_amount: Decimal
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class OrdersResponse(BaseModel):
+    orders: List[OrderResponse]
+    page_size: int
+    next_cursor: Optional[str] = None
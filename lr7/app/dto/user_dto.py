@@ -1,6 +1,8 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Iterable, List, Optional
+from uuid import UUID
 
+import msgspec
 from pydantic import UUID4, BaseModel
 
 
@@ -28,9 +30,26 @@ class UserResponse(BaseModel):
         from_attributes = True
 
 
-class UsersResponse(BaseModel):
-    users: List[UserResponse]
-    total_count: int
-    page: int
+class UserListItem(msgspec.Struct):
+    """Пользователь в списках: собирается из строк запроса без валидации pydantic"""
+
+    id: UUID
+    username: str
+    email: str
+    description: Optional[str]
+    created_at: datetime
+    updated_at: Optional[datetime]
+
+
+class UsersResponse(msgspec.Struct, kw_only=True):
+    users: List[UserListItem]
+    total_count: Optional[int] = None
+    page: Optional[int] = None
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
+def to_user_items(rows: Iterable[Any]) -> List[UserListItem]:
+    """Строки (Row) или объекты User -> UserListItem одним вызовом msgspec"""
+    return msgspec.convert(rows, List[UserListItem], from_attributes=True)
@@ -0,0 +1,68 @@
+import csv
+import io
+from typing import AsyncIterator, Callable, List, Literal, Sequence
+
+import msgspec
+from litestar.response import Stream
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+BatchSource = Callable[[AsyncSession], AsyncIterator[List[Row]]]
+
+
+async def ndjson_chunks(batches: AsyncIterator[List[Row]]) -> AsyncIterator[bytes]:
+    encoder = msgspec.json.Encoder(decimal_format="number")
+    async for batch in batches:
+        yield encoder.encode_lines([row._asdict() for row in batch])
+
+
+async def csv_chunks(
+    batches: AsyncIterator[List[Row]], columns: Sequence[str]
+) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def export_stream(
+    session_factory: async_sessionmaker,
+    source: BatchSource,
+    columns: Sequence[str],
+    fmt: ExportFormat,
+    name: str,
+) -> Stream:
+    """Потоковый ответ: сессия живёт внутри генератора, а не в DI запроса
+
+    Зависимость db_session закрывается раньше, чем Litestar дочитает поток,
+    поэтому генератор сам открывает сессию и держит серверный курсор.
+    """
+
+    async def generate() -> AsyncIterator[bytes]:
+        async with session_factory() as session:
+            batches = source(session)
+            if fmt == "csv":
+                chunks = csv_chunks(batches, columns)
+            else:
+                chunks = ndjson_chunks(batches)
+            async for chunk in chunks:
+                yield chunk
+
+    return Stream(
+        generate(),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
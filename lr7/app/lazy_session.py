@@ -0,0 +1,87 @@
+import time
+from typing import Any, Optional
+
+from metrics import PoolMetrics
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+
+class LazySession:
+    """Прокси AsyncSession: сессия и соединение из пула берутся при первом запросе
+
+    Запросы, которые ответили из кэша или упали на валидации, так и не
+    занимают соединение. Время ожидания соединения пишется в PoolMetrics.
+    """
+
+    def __init__(self, factory: async_sessionmaker, metrics: PoolMetrics):
+        self._factory = factory
+        self._metrics = metrics
+        self._session: Optional[AsyncSession] = None
+        self._connected = False
+        metrics.sessions += 1
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._factory()
+        return self._session
+
+    @property
+    def info(self) -> dict:
+        return self.session.info
+
+    async def _acquire(self) -> AsyncSession:
+        session = self.session
+        if not self._connected:
+            start = time.perf_counter()
+            await session.connection()
+            self._metrics.observe_checkout(time.perf_counter() - start)
+            self._connected = True
+        return session
+
+    async def execute(self, *args, **kwargs) -> Any:
+        return await (await self._acquire()).execute(*args, **kwargs)
+
+    async def scalar(self, *args, **kwargs) -> Any:
+        return await (await self._acquire()).scalar(*args, **kwargs)
+
+    async def scalars(self, *args, **kwargs) -> Any:
+        return await (await self._acquire()).scalars(*args, **kwargs)
+
+    async def stream(self, *args, **kwargs) -> Any:
+        return await (await self._acquire()).stream(*args, **kwargs)
+
+    async def get(self, *args, **kwargs) -> Any:
+        return await (await self._acquire()).get(*args, **kwargs)
+
+    def add(self, instance: Any) -> None:
+        self.session.add(instance)
+
+    async def delete(self, instance: Any) -> None:
+        await (await self._acquire()).delete(instance)
+
+    async def flush(self, *args, **kwargs) -> None:
+        await (await self._acquire()).flush(*args, **kwargs)
+
+    async def refresh(self, *args, **kwargs) -> None:
+        await (await self._acquire()).refresh(*args, **kwargs)
+
+    async def commit(self) -> None:
+        if self._session is None:
+            return
+        await self._session.commit()
+        # После commit соединение вернулось в пул
+        self._connected = False
+
+    async def rollback(self) -> None:
+        if self._session is None:
+            return
+        await self._session.rollback()
+        self._connected = False
+
+    async def close(self) -> None:
+        if self._session is None:
+            self._metrics.unused_sessions += 1
+            return
+        await self._session.close()
+        self._session = None
+        self._connected = False
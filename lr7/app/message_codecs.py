@@ -0,0 +1,146 @@
+import os
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Mapping, Optional
+from uuid import UUID
+
+import msgpack
+import orjson
+
+try:
+    import zstandard
+except ImportError:  # сжатие конвертов необязательно
+    zstandard = None
+
+SCHEMA_VERSION = 1
+SCHEMA_VERSION_HEADER = "x-schema-version"
+BATCH_HEADER = "x-batch"
+
+MESSAGE_CODEC = os.getenv("MESSAGE_CODEC", "json")
+# Меньше порога zstd не выигрывает в размере, а время тратит
+ZSTD_MIN_SIZE = int(os.getenv("ZSTD_MIN_SIZE", "1024"))
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))
+
+
+class UnsupportedMessageError(ValueError):
+    pass
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется")
+
+
+class JsonCodec:
+    """Компактный JSON через orjson: без отступов и пробелов"""
+
+    content_type = "application/json"
+
+    def encode(self, value: Any) -> bytes:
+        return orjson.dumps(value, default=_default)
+
+    def decode(self, body: bytes) -> Any:
+        return orjson.loads(body)
+
+
+class MsgpackCodec:
+    """MessagePack: меньше JSON и быстрее разбирается"""
+
+    content_type = "application/msgpack"
+
+    def encode(self, value: Any) -> bytes:
+        return msgpack.packb(value, default=_default)
+
+    def decode(self, body: bytes) -> Any:
+        return msgpack.unpackb(body)
+
+
+CODECS = {codec.content_type: codec for codec in (JsonCodec(), MsgpackCodec())}
+CODEC_NAMES = {"json": JsonCodec.content_type, "msgpack": MsgpackCodec.content_type}
+
+
+def get_codec(name: str = MESSAGE_CODEC):
+    """Кодек по имени (json, msgpack) или content-type"""
+    content_type = CODEC_NAMES.get(name, name)
+    if content_type not in CODECS:
+        raise UnsupportedMessageError(f"Неизвестный кодек: {name}")
+    return CODECS[content_type]
+
+
+@dataclass
+class EncodedMessage:
+    body: bytes
+    content_type: str
+    content_encoding: Optional[str] = None
+    headers: Dict[str, Any] = field(default_factory=dict)
+
+
+def encode_message(
+    value: Any, codec=None, schema_version: int = SCHEMA_VERSION
+) -> EncodedMessage:
+    codec = codec or get_codec()
+    return EncodedMessage(
+        body=codec.encode(value),
+        content_type=codec.content_type,
+        headers={SCHEMA_VERSION_HEADER: schema_version},
+    )
+
+
+def encode_batch(
+    values: List[Any],
+    codec=None,
+    compress: bool = True,
+    schema_version: int = SCHEMA_VERSION,
+) -> EncodedMessage:
+    """Конверт: пачка сообщений в одном теле, при размере от порога — в zstd"""
+    codec = codec or get_codec()
+    body = codec.encode(values)
+    content_encoding = None
+    if compress and zstandard is not None and len(body) >= ZSTD_MIN_SIZE:
+        body = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+        content_encoding = "zstd"
+    return EncodedMessage(
+        body=body,
+        content_type=codec.content_type,
+        content_encoding=content_encoding,
+        headers={SCHEMA_VERSION_HEADER: schema_version, BATCH_HEADER: True},
+    )
+
+
+def decode_message(
+    body: bytes,
+    content_type: Optional[str] = None,
+    content_encoding: Optional[str] = None,
+    headers: Optional[Mapping[str, Any]] = None,
+) -> List[Any]:
+    """Разобрать тело по content-type; всегда возвращает список сообщений
+
+    Сообщения без content-type считаются JSON, как у старого producer_pika.
+    Версия схемы новее поддерживаемой отклоняется, чтобы старый консьюмер
+    не записал данные, которые не понимает.
+    """
+    headers = headers or {}
+    version = int(headers.get(SCHEMA_VERSION_HEADER, SCHEMA_VERSION))
+    if version > SCHEMA_VERSION:
+        raise UnsupportedMessageError(f"Версия схемы {version} не поддерживается")
+
+    if content_encoding == "zstd":
+        if zstandard is None:
+            raise UnsupportedMessageError("Для zstd нужен пакет zstandard")
+        try:
+            body = zstandard.ZstdDecompressor().decompress(body)
+        except zstandard.ZstdError as e:
+            raise UnsupportedMessageError(f"Повреждённый zstd-конверт: {e}") from e
+    elif content_encoding:
+        raise UnsupportedMessageError(f"Неизвестное сжатие: {content_encoding}")
+
+    codec = CODECS.get((content_type or JsonCodec.content_type).split(";")[0])
+    if codec is None:
+        raise UnsupportedMessageError(f"Неизвестный content-type: {content_type}")
+
+    value = codec.decode(body)
+    return value if headers.get(BATCH_HEADER) else [value]
@@ -0,0 +1,70 @@
+from typing import Any, Dict
+
+
+class PoolMetrics:
+    """Счётчики использования пула соединений запросами"""
+
+    def __init__(self):
+        self.sessions = 0
+        self.unused_sessions = 0
+        self.checkouts = 0
+        self.checkout_seconds_total = 0.0
+        self.checkout_seconds_max = 0.0
+
+    def observe_checkout(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.checkout_seconds_total += seconds
+        self.checkout_seconds_max = max(self.checkout_seconds_max, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        average = self.checkout_seconds_total / self.checkouts if self.checkouts else 0
+        return {
+            "sessions": self.sessions,
+            "sessions_without_db": self.unused_sessions,
+            "checkouts": self.checkouts,
+            "checkout_ms_avg": round(average * 1000, 3),
+            "checkout_ms_max": round(self.checkout_seconds_max * 1000, 3),
+        }
+
+
+class OutboxMetrics:
+    """Счётчики relay outbox: размер пачек и задержка доставки событий"""
+
+    def __init__(self):
+        self.batches = 0
+        self.events_sent = 0
+        self.publish_failures = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.lag_seconds = 0.0
+        self.lag_seconds_max = 0.0
+
+    def observe_batch(self, sent: int, failed: int, lag_seconds: float) -> None:
+        self.batches += 1
+        self.events_sent += sent
+        self.publish_failures += failed
+        self.last_batch_size = sent + failed
+        self.max_batch_size = max(self.max_batch_size, self.last_batch_size)
+        self.lag_seconds = lag_seconds
+        self.lag_seconds_max = max(self.lag_seconds_max, lag_seconds)
+
+    def observe_idle(self) -> None:
+        self.last_batch_size = 0
+        self.lag_seconds = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        average = self.events_sent / self.batches if self.batches else 0
+        return {
+            "batches": self.batches,
+            "events_sent": self.events_sent,
+            "publish_failures": self.publish_failures,
+            "batch_size_last": self.last_batch_size,
+            "batch_size_avg": round(average, 1),
+            "batch_size_max": self.max_batch_size,
+            "lag_ms": round(self.lag_seconds * 1000, 3),
+            "lag_ms_max": round(self.lag_seconds_max * 1000, 3),
+        }
+
+
+pool_metrics = PoolMetrics()
+outbox_metrics = OutboxMetrics()
@@ -6,12 +6,14 @@ from sqlalchemy import (
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     Numeric,
     String,
     Table,
+    true,
 )
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -21,7 +23,11 @@ order_product_association = Table(
     Base.metadata,
     Column("order_id", UUID(as_uuid=True), ForeignKey("orders.id"), primary_key=True),
     Column(
-        "product_id", UUID(as_uuid=True), ForeignKey("products.id"), primary_key=True
+        "product_id",
+        UUID(as_uuid=True),
+        ForeignKey("products.id"),
+        primary_key=True,
+        index=True,
     ),
     Column("quantity", Integer, nullable=False),
     Column("price_at_time", Numeric(10, 2), nullable=False),
@@ -35,18 +41,36 @@ class User(Base):
     username = Column(String, nullable=False, unique=True)
     email = Column(String, nullable=False, unique=True)
     description = Column(String, nullable=True)
-    created_at = Column(DateTime, default=datetime.now)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
     updated_at = Column(DateTime, onupdate=datetime.now)
 
     addresses = relationship("Address", back_populates="user")
     orders = relationship("Order", back_populates="user")
 
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+        Index(
+            "ix_users_username_trgm",
+            "username",
+            postgresql_using="gin",
+            postgresql_ops={"username": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_users_email_trgm",
+            "email",
+            postgresql_using="gin",
+            postgresql_ops={"email": "gin_trgm_ops"},
+        ),
+    )
+
 
 class Address(Base):
     __tablename__ = "addresses"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    user_id = Column(
+        UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True
+    )
     street = Column(String, nullable=False)
     city = Column(String, nullable=False)
     state = Column(String)
@@ -67,6 +91,7 @@ class Product(Base):
     price = Column(Numeric(10, 2), nullable=False)
     description = Column(String)
     stock_quantity = Column(Integer, default=0)
+    available = Column(Boolean, nullable=False, default=True, server_default=true())
     created_at = Column(DateTime, default=datetime.now)
 
     orders = relationship(
@@ -79,13 +104,55 @@ class Order(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
-    address_id = Column(UUID(as_uuid=True), ForeignKey("addresses.id"), nullable=False)
+    address_id = Column(
+        UUID(as_uuid=True), ForeignKey("addresses.id"), nullable=False, index=True
+    )
     status = Column(String, default="pending")
     total_amount = Column(Numeric(10, 2), default=0)
-    created_at = Column(DateTime, default=datetime.now)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
 
     user = relationship("User", back_populates="orders")
     address = relationship("Address")
     products = relationship(
         "Product", secondary=order_product_association, back_populates="orders"
     )
+
+    __table_args__ = (
+        Index("ix_orders_user_id_created_at", "user_id", "created_at", "id"),
+        Index("ix_orders_status_created_at", "status", "created_at", "id"),
+    )
+
+
+class OutboxEvent(Base):
+    """Событие, записанное в одной транзакции с изменением и ждущее отправки"""
+
+    __tablename__ = "outbox_events"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    event_type = Column(String, nullable=False)
+    aggregate_type = Column(String, nullable=False)
+    aggregate_id = Column(UUID(as_uuid=True), nullable=False)
+    queue = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Relay читает только неотправленные события, частичный индекс мал
+        Index(
+            "ix_outbox_events_unsent",
+            "created_at",
+            postgresql_where=sent_at.is_(None),
+        ),
+    )
+
+
+class ProcessedMessage(Base):
+    """Отметка об обработанном сообщении очереди для отсева повторов"""
+
+    __tablename__ = "processed_messages"
+
+    message_id = Column(String, primary_key=True)
+    # Консьюмер, занявший сообщение; NULL — обработка подтверждена
+    owner = Column(String, nullable=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,152 @@
+import asyncio
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+from broker import broker as default_broker
+from faststream.rabbit import RabbitBroker, RabbitQueue
+from message_codecs import encode_message
+from metrics import OutboxMetrics, outbox_metrics
+from models import OutboxEvent
+from repositories.outbox_repository import OutboxRepository
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+OUTBOX_RELAY_ENABLED = os.getenv("OUTBOX_RELAY_ENABLED", "true").lower() == "true"
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1.0"))
+
+
+def event_message(event: OutboxEvent) -> Dict[str, Any]:
+    return {
+        "event_id": str(event.id),
+        "event_type": event.event_type,
+        "aggregate_type": event.aggregate_type,
+        "aggregate_id": str(event.aggregate_id),
+        "occurred_at": event.created_at.isoformat(),
+        "data": event.payload,
+    }
+
+
+class OutboxRelay:
+    """Фоновая доставка событий из outbox в RabbitMQ
+
+    Событие помечается отправленным только после подтверждения брокера,
+    поэтому при сбое оно уйдёт повторно: консьюмеры должны быть идемпотентны
+    по event_id. Несколько relay могут работать параллельно (SKIP LOCKED).
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        broker: RabbitBroker = default_broker,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        poll_interval: float = OUTBOX_POLL_INTERVAL,
+        metrics: OutboxMetrics = outbox_metrics,
+    ):
+        self.session_factory = session_factory
+        self.broker = broker
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.metrics = metrics
+        self._declared: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _declare(self, queue: str) -> None:
+        # Очередь объявляется до публикации, чтобы события не терялись,
+        # пока консьюмер ещё не запущен
+        if queue not in self._declared:
+            await self.broker.declare_queue(RabbitQueue(queue, durable=True))
+            self._declared.add(queue)
+
+    async def _publish(self, event: OutboxEvent) -> None:
+        encoded = encode_message(event_message(event))
+        await self.broker.publish(
+            encoded.body,
+            queue=event.queue,
+            content_type=encoded.content_type,
+            headers=encoded.headers,
+            message_id=str(event.id),
+            message_type=event.event_type,
+            persist=True,
+        )
+
+    async def run_once(self) -> int:
+        """Отправить одну пачку событий; возвращает число отправленных
+
+        Публикации пачки идут параллельно и ждут confirm вместе, а не по
+        одному round trip на событие. Неподтверждённые события остаются
+        неотправленными и попадут в следующую пачку.
+        """
+        async with self.session_factory() as session:
+            outbox = OutboxRepository(session)
+            events = await outbox.claim_batch(self.batch_size)
+            if not events:
+                self.metrics.observe_idle()
+                return 0
+
+            for queue in {event.queue for event in events}:
+                await self._declare(queue)
+
+            lag = (datetime.now() - events[0].created_at).total_seconds()
+            results = await asyncio.gather(
+                *(self._publish(event) for event in events), return_exceptions=True
+            )
+            sent = [
+                event.id
+                for event, result in zip(events, results)
+                if not isinstance(result, BaseException)
+            ]
+            failed = len(events) - len(sent)
+            if failed:
+                print(f"Не подтверждено событий outbox: {failed} из {len(events)}")
+
+            await outbox.mark_sent(sent)
+            await session.commit()
+
+        self.metrics.observe_batch(len(sent), failed, lag)
+        return len(sent)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.broker.connect()
+                sent = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Ошибка отправки outbox: {e}")
+                self._declared.clear()
+                sent = 0
+            if sent < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+if __name__ == "__main__":
+    from database import DatabaseSettings, create_engine_from_settings
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    async def main() -> None:
+        engine = create_engine_from_settings(DatabaseSettings.from_env())
+        relay = OutboxRelay(
+            async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        )
+        try:
+            await relay.run()
+        finally:
+            await default_broker.stop()
+            await engine.dispose()
+
+    asyncio.run(main())
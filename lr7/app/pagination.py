@@ -0,0 +1,55 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def to_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Привести время с часовым поясом к локальному наивному
+
+    created_at пишется как datetime.now() в колонку без пояса, и asyncpg
+    отказывается сравнивать её со значением, у которого пояс есть.
+    """
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+
+def encode_cursor(created_at: datetime, row_id: UUID) -> str:
+    """Упаковать позицию (created_at, id) в непрозрачный курсор"""
+    payload = json.dumps(
+        {"created_at": created_at.isoformat(), "id": str(row_id)},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """Распаковать курсор обратно в (created_at, id)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = to_naive(datetime.fromisoformat(payload["created_at"]))
+        return created_at, UUID(payload["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+
+async def estimate_row_count(session: AsyncSession, table_name: str) -> Optional[int]:
+    """Оценка числа строк таблицы по статистике планировщика (pg_class.reltuples)"""
+    result = await session.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"),
+        {"name": table_name},
+    )
+    estimate = result.scalar_one_or_none()
+    if estimate is None or estimate < 0:
+        return None
+    return estimate
@@ -1,8 +1,9 @@
 import pika
-import json
 import uuid
 from datetime import datetime
 
+from pika_publisher import PikaPublisher
+
 connection_params = pika.ConnectionParameters(
     host='localhost',
     port=5672,
@@ -10,23 +11,22 @@ connection_params = pika.ConnectionParameters(
     credentials=pika.PlainCredentials('guest', 'guest')
 )
 
+publisher = PikaPublisher(connection_params)
+
+
 def send_message(queue_name: str, message: dict):
-    connection = pika.BlockingConnection(connection_params)
-    channel = connection.channel()
+    publisher.publish(queue_name, message)
+    print(f"Сообщение {message['id']} отправлено в очередь '{queue_name}'")
+
+
+def send_messages(queue_name: str, messages: list):
+    count = publisher.publish_batch(queue_name, messages)
+    print(f"Пачка из {count} сообщений отправлена в очередь '{queue_name}'\n")
 
-    channel.queue_declare(queue=queue_name, durable=True)
 
-    channel.basic_publish(
-        exchange='',
-        routing_key=queue_name,
-        body=json.dumps(message, ensure_ascii=False, indent=2),
-        properties=pika.BasicProperties(
-            content_type='application/json',
-            delivery_mode=2,
-        )
-    )
-    print(f"Сообщение отправлено в очередь '{queue_name}':\n{json.dumps(message, indent=2)}\n")
-    connection.close()
+def send_envelope(queue_name: str, messages: list):
+    count = publisher.publish_envelope(queue_name, messages)
+    print(f"Конверт из {count} сообщений отправлен в очередь '{queue_name}'\n")
 
 
 def send_products():
@@ -68,8 +68,7 @@ def send_products():
         }
     ]
 
-    for product in products:
-        send_message("product", product)
+    send_messages("product", products)
 
 
 def send_orders():
@@ -109,12 +108,12 @@ def send_orders():
         }
     ]
 
-    for order in orders:
-        send_message("order", order)
+    send_envelope("order", orders)
 
 
 if __name__ == "__main__":
     print("Запуск продюсера на pika...\n")
     send_products()
     send_orders()
+    publisher.close()
     print("Все сообщения отправлены!")
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import os
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional
+from uuid import UUID
+
+from local_cache import LRUCache
+from models import Product
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from redis_client import get_redis
+
+PRODUCT_CACHE_SIZE = int(os.getenv("PRODUCT_CACHE_SIZE", "10000"))
+PRODUCT_CACHE_LOCAL_TTL = float(os.getenv("PRODUCT_CACHE_LOCAL_TTL", "30"))
+PRODUCT_CACHE_TTL = int(os.getenv("PRODUCT_CACHE_TTL", "300"))
+
+INVALIDATION_CHANNEL = "products:invalidate"
+PAGE_VERSION_KEY = "products:page_version"
+
+
+def serialize_product(product: Product) -> Dict[str, Any]:
+    return {
+        "id": str(product.id),
+        "name": product.name,
+        "price": str(product.price),
+        "description": product.description,
+        "stock_quantity": product.stock_quantity,
+        "available": product.available,
+        "created_at": product.created_at.isoformat() if product.created_at else None,
+    }
+
+
+def deserialize_product(data: Dict[str, Any]) -> Product:
+    """Отсоединённая копия товара: её нельзя изменять и сохранять через сессию"""
+    return Product(
+        id=UUID(data["id"]),
+        name=data["name"],
+        price=Decimal(data["price"]),
+        description=data["description"],
+        stock_quantity=data["stock_quantity"],
+        # Записи кэша до появления available его не содержат
+        available=data.get("available", True),
+        created_at=(
+            datetime.fromisoformat(data["created_at"]) if data["created_at"] else None
+        ),
+    )
+
+
+class ProductCache:
+    """Двухуровневый кэш товаров: LRU в процессе перед общим Redis
+
+    Изменения товаров рассылаются через Redis pub/sub, и каждый воркер
+    сбрасывает у себя локальные записи. Страницы каталога кэшируются под
+    номером версии, который увеличивается при любом изменении товаров.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        local: Optional[LRUCache] = None,
+        ttl: int = PRODUCT_CACHE_TTL,
+    ):
+        self.redis = redis
+        self.local = local or LRUCache(
+            maxsize=PRODUCT_CACHE_SIZE, ttl=PRODUCT_CACHE_LOCAL_TTL
+        )
+        self.ttl = ttl
+        self.page_version = 0
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self._listener: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def product_key(product_id: UUID) -> str:
+        return f"products:{product_id}"
+
+    def page_key(self, **params) -> str:
+        args = ":".join(f"{name}={params[name]}" for name in sorted(params))
+        return f"products:page:v{self.page_version}:{args}"
+
+    async def _get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None:
+            return value
+
+        try:
+            payload = await self.redis.get(key)
+        except RedisError as e:
+            print(f"Redis недоступен, читаем товары из БД: {e}")
+            return None
+
+        if payload is None:
+            self.redis_misses += 1
+            return None
+
+        self.redis_hits += 1
+        value = json.loads(payload)
+        self.local.set(key, value)
+        return value
+
+    async def _set(self, key: str, value: Any) -> None:
+        self.local.set(key, value)
+        try:
+            await self.redis.set(key, json.dumps(value), ex=self.ttl)
+        except RedisError as e:
+            print(f"Не удалось записать {key} в Redis: {e}")
+
+    async def get_product(self, product_id: UUID) -> Optional[Product]:
+        data = await self._get(self.product_key(product_id))
+        return deserialize_product(data) if data else None
+
+    async def set_product(self, product: Product) -> None:
+        await self._set(self.product_key(product.id), serialize_product(product))
+
+    async def get_page(self, **params) -> Optional[Dict[str, Any]]:
+        data = await self._get(self.page_key(**params))
+        if not data:
+            return None
+        return {**data, "items": [deserialize_product(i) for i in data["items"]]}
+
+    async def set_page(self, page: Dict[str, Any], **params) -> None:
+        data = {**page, "items": [serialize_product(i) for i in page["items"]]}
+        await self._set(self.page_key(**params), data)
+
+    async def invalidate(self, product_ids: Iterable[UUID]) -> None:
+        """Сбросить товары во всех воркерах и перевести страницы на новую версию"""
+        keys = [self.product_key(product_id) for product_id in product_ids]
+        for key in keys:
+            self.local.delete(key)
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                if keys:
+                    pipe.delete(*keys)
+                pipe.incr(PAGE_VERSION_KEY)
+                results = await pipe.execute()
+            version = results[-1]
+            self._apply_page_version(version)
+            await self.redis.publish(
+                INVALIDATION_CHANNEL,
+                json.dumps({"keys": keys, "page_version": version}),
+            )
+        except RedisError as e:
+            print(f"Не удалось разослать инвалидацию товаров: {e}")
+            self.local.clear()
+
+    def _apply_page_version(self, version: int) -> None:
+        self.page_version = max(self.page_version, int(version))
+
+    async def start(self) -> None:
+        """Подписаться на инвалидацию из других воркеров"""
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    # Сообщения, пропущенные без подписки, восстановить нельзя
+                    self.local.clear()
+                    self._apply_page_version(
+                        await self.redis.get(PAGE_VERSION_KEY) or 0
+                    )
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        event = json.loads(message["data"])
+                        for key in event["keys"]:
+                            self.local.delete(key)
+                        self._apply_page_version(event["page_version"])
+            except RedisError as e:
+                print(f"Подписка на инвалидацию товаров прервана: {e}")
+                await asyncio.sleep(1)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "local": self.local.stats(),
+            "redis": {"hits": self.redis_hits, "misses": self.redis_misses},
+            "page_version": self.page_version,
+        }
+
+
+_product_cache: Optional[ProductCache] = None
+
+
+def get_product_cache() -> ProductCache:
+    """Общий для процесса экземпляр кэша товаров"""
+    global _product_cache
+    if _product_cache is None:
+        _product_cache = ProductCache(get_redis())
+    return _product_cache
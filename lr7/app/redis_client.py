@@ -0,0 +1,44 @@
+import os
+from typing import Optional
+
+from redis.asyncio import ConnectionPool, Redis
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5"))
+
+_pool: Optional[ConnectionPool] = None
+_client: Optional[Redis] = None
+
+
+def get_redis() -> Redis:
+    """Общий асинхронный клиент Redis поверх пула соединений"""
+    global _pool, _client
+    if _client is None:
+        _pool = ConnectionPool.from_url(
+            REDIS_URL,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+            health_check_interval=30,
+        )
+        _client = Redis(connection_pool=_pool)
+    return _client
+
+
+def set_redis(client: Redis) -> None:
+    """Подменить клиент, например на fakeredis.aioredis.FakeRedis в тестах"""
+    global _pool, _client
+    _pool = None
+    _client = client
+
+
+async def close_redis() -> None:
+    """Закрыть клиент и пул соединений при остановке приложения"""
+    global _pool, _client
+    if _client is not None:
+        await _client.aclose()
+    if _pool is not None:
+        await _pool.disconnect()
+    _pool = None
+    _client = None
@@ -0,0 +1,41 @@
+import asyncio
+import sys
+from datetime import datetime
+from uuid import uuid4
+
+from dto.user_dto import UserResponse
+from redis_client import close_redis, get_redis, set_redis
+from services.user_cache import UserCache
+
+
+async def main():
+    """Демонстрация read-through кэша пользователей (--fake для fakeredis)"""
+    if "--fake" in sys.argv:
+        from fakeredis import FakeAsyncRedis
+
+        set_redis(FakeAsyncRedis())
+
+    redis = get_redis()
+    cache = UserCache(redis, ttl=60)
+
+    user = UserResponse(
+        id=uuid4(),
+        username="redis_demo",
+        email="redis.demo@example.com",
+        description="Пользователь из кэша",
+        created_at=datetime.now(),
+        updated_at=None,
+    )
+
+    await cache.set(user)
+    print(f"Из кэша: {await cache.get(user.id)}")
+    print(f"TTL ключа: {await redis.ttl(cache._key(user.id))} с")
+
+    await cache.invalidate(user.id)
+    print(f"После инвалидации: {await cache.get(user.id)}")
+
+    await close_redis()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,20 @@
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy.orm.interfaces import LoaderOption
+
+
+def apply_includes(
+    stmt, loaders: Dict[str, LoaderOption], include: Optional[Iterable[str]]
+):
+    """Подключить eager-загрузку связей по списку имён, например ["user", "products"]"""
+    if not include:
+        return stmt
+
+    include = list(dict.fromkeys(include))
+    unknown = [name for name in include if name not in loaders]
+    if unknown:
+        raise ValueError(
+            f"Unknown include: {', '.join(unknown)}. "
+            f"Available: {', '.join(sorted(loaders))}"
+        )
+    return stmt.options(*(loaders[name] for name in include))
@@ -1,31 +1,131 @@
-from typing import List
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
 from uuid import UUID
 
 from models import Order, order_product_association
+from pagination import decode_cursor, encode_cursor, to_naive
 from pydantic import ConfigDict
-from sqlalchemy import select
+from repositories.includes import apply_includes
+from sqlalchemy import Row, insert, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 
 
 class OrderRepository:
+    # Связи, которые можно запросить через include
+    LOADERS = {
+        "user": joinedload(Order.user),
+        "address": joinedload(Order.address),
+        "products": selectinload(Order.products),
+    }
+
+    EXPORT_COLUMNS = (
+        Order.id,
+        Order.user_id,
+        Order.address_id,
+        Order.status,
+        Order.total_amount,
+        Order.created_at,
+    )
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_by_id(self, order_id: UUID) -> Order | None:
+    async def get_by_id(
+        self, order_id: UUID, include: Optional[List[str]] = None
+    ) -> Order | None:
         stmt = select(Order).where(Order.id == order_id)
+        stmt = apply_includes(stmt, self.LOADERS, include)
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
-    async def get_all(self, skip: int = 0, limit: int = 100) -> List[Order]:
+    async def get_all(
+        self, skip: int = 0, limit: int = 100, include: Optional[List[str]] = None
+    ) -> List[Order]:
         stmt = select(Order).offset(skip).limit(limit)
+        stmt = apply_includes(stmt, self.LOADERS, include)
         result = await self.session.execute(stmt)
         return result.scalars().all()
 
-    async def get_by_user_id(self, user_id: UUID) -> List[Order]:
-        stmt = select(Order).where(Order.user_id == user_id)
+    async def get_by_user_id(
+        self,
+        user_id: UUID,
+        limit: Optional[int] = None,
+        include: Optional[List[str]] = None,
+    ) -> List[Order]:
+        """Заказы пользователя от новых к старым; limit=None — все заказы"""
+        stmt = (
+            select(Order)
+            .where(Order.user_id == user_id)
+            .order_by(Order.created_at.desc(), Order.id.desc())
+        )
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        stmt = apply_includes(stmt, self.LOADERS, include)
         result = await self.session.execute(stmt)
         return result.scalars().all()
 
+    async def get_by_keyset(
+        self,
+        count: int = 20,
+        cursor: Optional[str] = None,
+        user_id: Optional[UUID] = None,
+        status: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        include: Optional[List[str]] = None,
+    ) -> Tuple[List[Order], Optional[str]]:
+        """Заказы от новых к старым после курсора (created_at, id)
+
+        Фильтры по user_id и status обслуживаются индексами
+        ix_orders_user_id_created_at и ix_orders_status_created_at.
+        """
+        if count < 1:
+            return [], None
+
+        created_from, created_to = to_naive(created_from), to_naive(created_to)
+        stmt = select(Order)
+
+        if user_id:
+            stmt = stmt.where(Order.user_id == user_id)
+        if status:
+            stmt = stmt.where(Order.status == status)
+        if created_from:
+            stmt = stmt.where(Order.created_at >= created_from)
+        if created_to:
+            stmt = stmt.where(Order.created_at < created_to)
+        if cursor:
+            created_at, order_id = decode_cursor(cursor)
+            stmt = stmt.where(
+                tuple_(Order.created_at, Order.id) < (created_at, order_id)
+            )
+
+        stmt = stmt.order_by(Order.created_at.desc(), Order.id.desc()).limit(count + 1)
+        stmt = apply_includes(stmt, self.LOADERS, include)
+
+        result = await self.session.execute(stmt)
+        orders = result.scalars().all()
+
+        next_cursor = None
+        if len(orders) > count:
+            orders = orders[:count]
+            next_cursor = encode_cursor(orders[-1].created_at, orders[-1].id)
+
+        return orders, next_cursor
+
+    async def stream_all(
+        self, batch_size: int = 1000, user_id: Optional[UUID] = None
+    ) -> AsyncIterator[List[Row]]:
+        """Заказы пачками через серверный курсор, без загрузки в память"""
+        stmt = select(*self.EXPORT_COLUMNS)
+        if user_id:
+            stmt = stmt.where(Order.user_id == user_id)
+        stmt = stmt.execution_options(yield_per=batch_size)
+        result = await self.session.stream(stmt)
+        async for batch in result.partitions():
+            yield batch
+
     async def create(
         self,
         user_id: UUID,
@@ -33,29 +133,58 @@ class OrderRepository:
         product_items: List[dict],
         total_amount: float = 0,
     ) -> Order:
-        order = Order(user_id=user_id, address_id=address_id, total_amount=total_amount)
-        self.session.add(order)
-        await self.session.flush()
-
-        for item in product_items:
-            stmt = order_product_association.insert().values(
-                order_id=order.id,
-                product_id=item["product_id"],
-                quantity=item["quantity"],
-                price_at_time=item.get("price_at_time", 0),
+        # INSERT ... RETURNING сразу отдаёт заполненный объект без refresh
+        stmt = (
+            insert(Order)
+            .values(user_id=user_id, address_id=address_id, total_amount=total_amount)
+            .returning(Order)
+        )
+        order = (await self.session.execute(stmt)).scalar_one()
+
+        if product_items:
+            await self.session.execute(
+                order_product_association.insert().values(
+                    [
+                        {
+                            "order_id": order.id,
+                            "product_id": item["product_id"],
+                            "quantity": item["quantity"],
+                            "price_at_time": item.get("price_at_time", 0),
+                        }
+                        for item in product_items
+                    ]
+                )
             )
-            await self.session.execute(stmt)
 
-        await self.session.commit()
-        await self.session.refresh(order)
         return order
 
+    async def insert_many(self, orders: List[Dict[str, Any]]) -> Set[UUID]:
+        """Вставить пачку заказов; возвращает id реально вставленных
+
+        Заказы с уже существующим id пропускаются (ON CONFLICT DO NOTHING),
+        поэтому повторная доставка пачки не создаёт дублей.
+        """
+        if not orders:
+            return set()
+        orders_table = Order.__table__
+        stmt = (
+            pg_insert(orders_table)
+            .on_conflict_do_nothing(index_elements=[orders_table.c.id])
+            .returning(orders_table.c.id)
+        )
+        result = await self.session.execute(stmt, orders)
+        return set(result.scalars().all())
+
+    async def add_items_many(self, items: List[Dict[str, Any]]) -> None:
+        if items:
+            await self.session.execute(order_product_association.insert(), items)
+
     async def update_status(self, order_id: UUID, status: str) -> Order:
-        order = await self.get_by_id(order_id)
+        # Заказ, уже загруженный в сессию, берётся из identity map без SQL
+        order = await self.session.get(Order, order_id)
         if order:
             order.status = status
-            await self.session.commit()
-            await self.session.refresh(order)
+            await self.session.flush()
         return order
 
     async def delete(self, order_id: UUID) -> None:
@@ -66,4 +195,4 @@ class OrderRepository:
             )
             await self.session.execute(delete_stmt)
             await self.session.delete(order)
-            await self.session.commit()
+            await self.session.flush()
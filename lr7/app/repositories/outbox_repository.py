@@ -0,0 +1,62 @@
+from datetime import datetime
+from typing import Any, Dict, List
+from uuid import UUID
+
+from models import OutboxEvent
+from sqlalchemy import any_, bindparam, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class OutboxRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    def add(
+        self,
+        event_type: str,
+        aggregate_type: str,
+        aggregate_id: UUID,
+        payload: Dict[str, Any],
+        queue: str,
+    ) -> OutboxEvent:
+        """Записать событие в текущую транзакцию; уйдёт в брокер после commit"""
+        event = OutboxEvent(
+            event_type=event_type,
+            aggregate_type=aggregate_type,
+            aggregate_id=aggregate_id,
+            payload=payload,
+            queue=queue,
+        )
+        self.session.add(event)
+        return event
+
+    async def claim_batch(self, limit: int = 100) -> List[OutboxEvent]:
+        """Заблокировать пачку неотправленных событий до конца транзакции
+
+        SKIP LOCKED пропускает строки, которые уже взял другой relay, поэтому
+        несколько воркеров делят очередь без ожидания друг друга.
+        """
+        stmt = (
+            select(OutboxEvent)
+            .where(OutboxEvent.sent_at.is_(None))
+            .order_by(OutboxEvent.created_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
+    async def mark_sent(self, event_ids: List[UUID]) -> None:
+        """Пометить пачку отправленной одним UPDATE ... WHERE id = ANY(...)"""
+        if not event_ids:
+            return
+        ids_param = bindparam(
+            "event_ids", list(event_ids), type_=ARRAY(OutboxEvent.id.type)
+        )
+        stmt = (
+            update(OutboxEvent)
+            .where(OutboxEvent.id == any_(ids_param))
+            .values(sent_at=datetime.now())
+        )
+        await self.session.execute(stmt)
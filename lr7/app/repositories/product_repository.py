@@ -1,21 +1,116 @@
-from typing import Any, Dict, List, Optional
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
 from uuid import UUID
 
+from broker import PRODUCT_EVENTS_QUEUE
+from db_router import is_replica_session
 from models import Product
+from pagination import estimate_row_count
+from product_cache import ProductCache, serialize_product
 from pydantic import ConfigDict
-from sqlalchemy import func, select
+from repositories.outbox_repository import OutboxRepository
+from repositories.session_hooks import after_commit
+from sqlalchemy import (
+    Boolean,
+    Integer,
+    Row,
+    Update,
+    any_,
+    bindparam,
+    func,
+    literal_column,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
 class ProductRepository:
-    def __init__(self, session: AsyncSession):
+    EXPORT_COLUMNS = (
+        Product.id,
+        Product.name,
+        Product.price,
+        Product.description,
+        Product.stock_quantity,
+        Product.available,
+        Product.created_at,
+    )
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        cache: Optional[ProductCache] = None,
+        outbox: Optional[OutboxRepository] = None,
+    ):
         self.session = session
+        self.cache = cache
+        self.outbox = outbox
 
-    async def get_by_id(self, product_id: UUID) -> Product | None:
+    async def _load(self, product_id: UUID) -> Product | None:
         stmt = select(Product).where(Product.id == product_id)
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
+    def _fills_cache(self) -> bool:
+        """Кэш заполняется только из primary: реплика может вернуть старую строку"""
+        return self.cache is not None and not is_replica_session(self.session)
+
+    def _invalidate_after_commit(self, product_ids: List[UUID]) -> None:
+        if self.cache:
+            cache = self.cache
+            after_commit(self.session, lambda: cache.invalidate(product_ids))
+
+    def _add_event(
+        self, event_type: str, product_id: UUID, payload: Dict[str, Any]
+    ) -> None:
+        """Событие товара в outbox той же транзакции, что и изменение"""
+        if self.outbox:
+            self.outbox.add(
+                event_type, "product", product_id, payload, PRODUCT_EVENTS_QUEUE
+            )
+
+    async def get_by_id(self, product_id: UUID) -> Product | None:
+        """Товар через кэш; для изменения используются методы репозитория"""
+        if self.cache:
+            cached = await self.cache.get_product(product_id)
+            if cached:
+                return cached
+
+        product = await self._load(product_id)
+        if product and self._fills_cache():
+            await self.cache.set_product(product)
+        return product
+
+    async def get_many(self, product_ids: List[UUID]) -> List[Product]:
+        """Загрузить несколько товаров одним запросом WHERE id = ANY(...)"""
+        if not product_ids:
+            return []
+        ids_param = bindparam(
+            "product_ids", list(product_ids), type_=ARRAY(Product.id.type)
+        )
+        stmt = select(Product).where(Product.id == any_(ids_param))
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
+    async def stream_all(self, batch_size: int = 1000) -> AsyncIterator[List[Row]]:
+        """Все товары пачками через серверный курсор, минуя кэш"""
+        stmt = select(*self.EXPORT_COLUMNS).execution_options(yield_per=batch_size)
+        result = await self.session.stream(stmt)
+        async for batch in result.partitions():
+            yield batch
+
+    async def get_prices(self, product_ids: Iterable[UUID]) -> Dict[UUID, Decimal]:
+        """Текущие цены товаров одним запросом; отсутствующих id в ответе нет"""
+        product_ids = list(product_ids)
+        if not product_ids:
+            return {}
+        ids_param = bindparam("product_ids", product_ids, type_=ARRAY(Product.id.type))
+        stmt = select(Product.id, Product.price).where(Product.id == any_(ids_param))
+        result = await self.session.execute(stmt)
+        return {row.id: row.price for row in result}
+
     async def get_all(self, skip: int = 0, limit: int = 100) -> List[Product]:
         stmt = select(Product).offset(skip).limit(limit)
         result = await self.session.execute(stmt)
@@ -31,12 +126,13 @@ class ProductRepository:
             stock_quantity=stock_quantity,
         )
         self.session.add(product)
-        await self.session.commit()
-        await self.session.refresh(product)
+        await self.session.flush()
+        self._invalidate_after_commit([product.id])
+        self._add_event("product.created", product.id, serialize_product(product))
         return product
 
     async def update(self, product_id: UUID, **kwargs) -> Product:
-        product = await self.get_by_id(product_id)
+        product = await self._load(product_id)
         if not product:
             return None
 
@@ -44,27 +140,139 @@ class ProductRepository:
             if hasattr(product, field):
                 setattr(product, field, value)
 
-        await self.session.commit()
+        await self.session.flush()
         await self.session.refresh(product)
+        self._invalidate_after_commit([product_id])
+        self._add_event("product.updated", product_id, serialize_product(product))
         return product
 
     async def delete(self, product_id: UUID) -> None:
-        product = await self.get_by_id(product_id)
+        product = await self._load(product_id)
         if product:
             await self.session.delete(product)
-            await self.session.commit()
+            await self.session.flush()
+            self._invalidate_after_commit([product_id])
+            self._add_event("product.deleted", product_id, {"id": str(product_id)})
 
     async def update_stock(self, product_id: UUID, quantity: int) -> Product:
-        product = await self.get_by_id(product_id)
+        product = await self._load(product_id)
         if product:
             product.stock_quantity = quantity
-            await self.session.commit()
+            await self.session.flush()
             await self.session.refresh(product)
+            self._invalidate_after_commit([product_id])
+            self._add_stock_event(product_id, product.stock_quantity)
         return product
 
+    async def reserve_stock(self, quantities: Dict[UUID, int]) -> Dict[UUID, Row]:
+        """Атомарно списать остатки одним UPDATE ... WHERE stock_quantity >= :q
+
+        Возвращает зарезервированные строки (id, name, price, stock_quantity).
+        Если позиций меньше, чем запрошено, вызывающий код должен откатить
+        единицу работы.
+        """
+        if not quantities:
+            return {}
+
+        result = await self.session.execute(self._reserve_statement(quantities))
+        reserved = {row.id: row for row in result}
+        self._invalidate_after_commit(list(reserved))
+        for row in reserved.values():
+            self._add_stock_event(row.id, row.stock_quantity)
+        return reserved
+
+    def _reserve_statement(self, quantities: Dict[UUID, int]) -> Update:
+        """UPDATE ... FROM unnest: id и количества — два массива-параметра"""
+        products = Product.__table__
+        product_ids = sorted(quantities)
+        ids_param = bindparam("product_ids", product_ids, type_=ARRAY(Product.id.type))
+        quantities_param = bindparam(
+            "quantities",
+            [quantities[product_id] for product_id in product_ids],
+            type_=ARRAY(Integer),
+        )
+
+        # Строки блокируются в порядке id, чтобы встречные заказы не ловили deadlock
+        locked = (
+            select(products.c.id)
+            .where(products.c.id == any_(ids_param))
+            .order_by(products.c.id)
+            .with_for_update()
+            .cte("locked")
+        )
+        requested = select(
+            func.unnest(ids_param).label("id"),
+            func.unnest(quantities_param).label("quantity"),
+        ).subquery("requested")
+
+        return (
+            update(products)
+            .where(products.c.id == locked.c.id)
+            .where(products.c.id == requested.c.id)
+            .where(products.c.stock_quantity >= requested.c.quantity)
+            .values(stock_quantity=products.c.stock_quantity - requested.c.quantity)
+            .returning(
+                products.c.id,
+                products.c.name,
+                products.c.price,
+                products.c.stock_quantity,
+            )
+        )
+
+    def _add_stock_event(self, product_id: UUID, stock_quantity: int) -> None:
+        self._add_event(
+            "product.stock_changed",
+            product_id,
+            {"id": str(product_id), "stock_quantity": stock_quantity},
+        )
+
+    async def upsert_many(self, rows: List[Dict[str, Any]]) -> int:
+        """Вставить или обновить пачку товаров одним INSERT ... ON CONFLICT
+
+        События product.created/product.updated пишутся в outbox той же
+        транзакции; xmax = 0 в RETURNING отличает вставку от обновления.
+        """
+        if not rows:
+            return 0
+        stmt = pg_insert(Product).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Product.id],
+            set_={
+                "name": stmt.excluded.name,
+                "price": stmt.excluded.price,
+                "description": stmt.excluded.description,
+                "available": stmt.excluded.available,
+            },
+        ).returning(
+            *self.EXPORT_COLUMNS, literal_column("xmax = 0", Boolean).label("inserted")
+        )
+        result = await self.session.execute(stmt)
+        for row in result:
+            event_type = "product.created" if row.inserted else "product.updated"
+            self._add_event(event_type, row.id, serialize_product(row))
+        self._invalidate_after_commit([row["id"] for row in rows])
+        return len(rows)
+
     async def get_paginated(
-        self, page: int = 1, page_size: int = 10, category: Optional[str] = None
+        self,
+        page: int = 1,
+        page_size: int = 10,
+        category: Optional[str] = None,
+        include_total: bool = True,
+        estimate_total: bool = False,
     ) -> Dict[str, Any]:
+        cache_params = {
+            "page": page,
+            "page_size": page_size,
+            "category": category,
+            "include_total": include_total,
+            "estimate_total": estimate_total,
+        }
+        if self.cache:
+            cached = await self.cache.get_page(**cache_params)
+            if cached:
+                return cached
+
         offset = (page - 1) * page_size
 
         query = select(Product)
@@ -72,25 +280,52 @@ class ProductRepository:
         if category:
             query = query.where(Product.category == category)
 
-        products_query = query.offset(offset).limit(page_size)
-        result = await self.session.execute(products_query)
-        items = result.scalars().all()
+        total_items = None
+        if include_total and estimate_total and not category:
+            total_items = await estimate_row_count(self.session, Product.__tablename__)
 
-        count_query = select(func.count()).select_from(Product)
-        if category:
-            count_query = count_query.where(Product.category == category)
+        if not include_total or total_items is not None:
+            # Лишняя строка показывает, есть ли следующая страница
+            products_query = query.offset(offset).limit(page_size + 1)
+            result = await self.session.execute(products_query)
+            items = result.scalars().all()
+            has_next = len(items) > page_size
+            items = items[:page_size]
+        else:
+            products_query = query.add_columns(func.count().over().label("total_items"))
+            result = await self.session.execute(
+                products_query.offset(offset).limit(page_size)
+            )
+            rows = result.all()
+            items = [row[0] for row in rows]
+
+            if rows:
+                total_items = rows[0].total_items
+            elif page > 1:
+                count_query = select(func.count()).select_from(Product)
+                if category:
+                    count_query = count_query.where(Product.category == category)
+
+                total_result = await self.session.execute(count_query)
+                total_items = total_result.scalar()
+            else:
+                total_items = 0
 
-        total_result = await self.session.execute(count_query)
-        total_items = total_result.scalar()
+            has_next = offset + len(items) < total_items
 
-        total_pages = (total_items + page_size - 1) // page_size
+        total_pages = None
+        if total_items is not None:
+            total_pages = (total_items + page_size - 1) // page_size
 
-        return {
+        result = {
             "items": items,
             "page": page,
             "page_size": page_size,
             "total_pages": total_pages,
             "total_items": total_items,
-            "has_next": page < total_pages,
+            "has_next": has_next,
             "has_prev": page > 1,
         }
+        if self._fills_cache():
+            await self.cache.set_page(result, **cache_params)
+        return result
@@ -0,0 +1,39 @@
+from typing import Optional
+
+from product_cache import ProductCache
+from repositories.order_repository import OrderRepository
+from repositories.outbox_repository import OutboxRepository
+from repositories.product_repository import ProductRepository
+from repositories.session_hooks import discard_after_commit, run_after_commit
+from repositories.user_repository import UserRepository
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class UnitOfWork:
+    """Общая сессия репозиториев: вся бизнес-операция фиксируется одним commit"""
+
+    def __init__(
+        self, session: AsyncSession, product_cache: Optional[ProductCache] = None
+    ):
+        self.session = session
+        self.outbox = OutboxRepository(session)
+        self.users = UserRepository(session)
+        self.products = ProductRepository(session, product_cache, self.outbox)
+        self.orders = OrderRepository(session)
+
+    async def __aenter__(self) -> "UnitOfWork":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            await self.commit()
+        else:
+            await self.rollback()
+
+    async def commit(self) -> None:
+        await self.session.commit()
+        await run_after_commit(self.session)
+
+    async def rollback(self) -> None:
+        await self.session.rollback()
+        discard_after_commit(self.session)
@@ -1,52 +1,145 @@
-from typing import List, Tuple
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
 from uuid import UUID
 
 from dto.user_dto import UserCreate, UserUpdate
-from models import User
-from sqlalchemy import func, select
+from models import Address, User
+from pagination import decode_cursor, encode_cursor, estimate_row_count
+from repositories.includes import apply_includes
+from sqlalchemy import Row, any_, bindparam, func, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 
 class UserRepository:
+    # Связи, которые можно запросить через include
+    LOADERS = {
+        "addresses": selectinload(User.addresses),
+        "orders": selectinload(User.orders),
+    }
+
+    # Колонки для списков: строки без ORM-объектов и identity map
+    LIST_COLUMNS = (
+        User.id,
+        User.username,
+        User.email,
+        User.description,
+        User.created_at,
+        User.updated_at,
+    )
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_by_id(self, user_id: UUID) -> User | None:
+    async def get_by_id(
+        self, user_id: UUID, include: Optional[List[str]] = None
+    ) -> User | None:
         stmt = select(User).where(User.id == user_id)
+        stmt = apply_includes(stmt, self.LOADERS, include)
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
-    async def get_by_filter_with_count(
-        self, count: int = 10, page: int = 1, **kwargs
-    ) -> Tuple[List[User], int]:
-
-        stmt = select(User)
-
+    def _apply_filters(self, stmt, **kwargs):
         if "username" in kwargs and kwargs["username"]:
             stmt = stmt.where(User.username.ilike(f"%{kwargs['username']}%"))
         if "email" in kwargs and kwargs["email"]:
             stmt = stmt.where(User.email.ilike(f"%{kwargs['email']}%"))
+        return stmt
+
+    async def get_by_filter_with_count(
+        self,
+        count: int = 10,
+        page: int = 1,
+        include_total: bool = True,
+        estimate_total: bool = False,
+        **kwargs,
+    ) -> Tuple[List[Row], Optional[int]]:
+
+        stmt = self._apply_filters(select(*self.LIST_COLUMNS), **kwargs)
+        filtered = any(kwargs.get(field) for field in ("username", "email"))
 
         offset = (page - 1) * count
-        stmt = stmt.offset(offset).limit(count)
 
-        result = await self.session.execute(stmt)
-        users = result.scalars().all()
+        total_count = None
+        if include_total and estimate_total and not filtered:
+            total_count = await estimate_row_count(self.session, User.__tablename__)
 
-        count_stmt = select(func.count(User.id))
+        if not include_total or total_count is not None:
+            result = await self.session.execute(stmt.offset(offset).limit(count))
+            return result.all(), total_count
 
-        if "username" in kwargs and kwargs["username"]:
-            count_stmt = count_stmt.where(
-                User.username.ilike(f"%{kwargs['username']}%")
-            )
-        if "email" in kwargs and kwargs["email"]:
-            count_stmt = count_stmt.where(User.email.ilike(f"%{kwargs['email']}%"))
+        # Общее количество считается оконной функцией в том же запросе
+        stmt = stmt.add_columns(func.count().over().label("total_count"))
+        result = await self.session.execute(stmt.offset(offset).limit(count))
+        users = result.all()
 
-        total_result = await self.session.execute(count_stmt)
-        total_count = total_result.scalar_one()
+        if users:
+            total_count = users[0].total_count
+        elif page > 1:
+            count_stmt = self._apply_filters(select(func.count(User.id)), **kwargs)
+            total_result = await self.session.execute(count_stmt)
+            total_count = total_result.scalar_one()
+        else:
+            total_count = 0
 
         return users, total_count
 
+    async def get_by_keyset(
+        self, count: int = 10, cursor: Optional[str] = None, **kwargs
+    ) -> Tuple[List[Row], Optional[str]]:
+        """Страница пользователей после курсора (created_at, id) без OFFSET"""
+        if count < 1:
+            return [], None
+        stmt = self._apply_filters(select(*self.LIST_COLUMNS), **kwargs)
+
+        if cursor:
+            created_at, user_id = decode_cursor(cursor)
+            stmt = stmt.where(tuple_(User.created_at, User.id) > (created_at, user_id))
+
+        stmt = stmt.order_by(User.created_at, User.id).limit(count + 1)
+
+        result = await self.session.execute(stmt)
+        users = result.all()
+
+        next_cursor = None
+        if len(users) > count:
+            users = users[:count]
+            next_cursor = encode_cursor(users[-1].created_at, users[-1].id)
+
+        return users, next_cursor
+
+    async def search(self, term: str, count: int = 10) -> List[Row]:
+        """Нечёткий поиск по username/email, отсортированный по сходству"""
+        similarity = func.greatest(
+            func.similarity(User.username, term), func.similarity(User.email, term)
+        )
+        # Оператор % (pg_trgm) обслуживается GIN-индексами ix_users_*_trgm
+        stmt = (
+            select(*self.LIST_COLUMNS)
+            .where(or_(User.username.op("%")(term), User.email.op("%")(term)))
+            .order_by(similarity.desc(), User.id)
+            .limit(count)
+        )
+        result = await self.session.execute(stmt)
+        return result.all()
+
+    async def get_address_owners(self, address_ids: Iterable[UUID]) -> Dict[UUID, UUID]:
+        """Владельцы адресов {address_id: user_id}; неизвестных адресов в ответе нет"""
+        address_ids = list(address_ids)
+        if not address_ids:
+            return {}
+        ids_param = bindparam("address_ids", address_ids, type_=ARRAY(Address.id.type))
+        stmt = select(Address.id, Address.user_id).where(Address.id == any_(ids_param))
+        result = await self.session.execute(stmt)
+        return {row.id: row.user_id for row in result}
+
+    async def stream_all(self, batch_size: int = 1000) -> AsyncIterator[List[Row]]:
+        """Все пользователи пачками через серверный курсор, без загрузки в память"""
+        stmt = select(*self.LIST_COLUMNS).execution_options(yield_per=batch_size)
+        result = await self.session.stream(stmt)
+        async for batch in result.partitions():
+            yield batch
+
     async def create(self, user_data: UserCreate) -> User:
         user = User(
             username=user_data.username,
@@ -54,8 +147,7 @@ class UserRepository:
             description=user_data.description,
         )
         self.session.add(user)
-        await self.session.commit()
-        await self.session.refresh(user)
+        await self.session.flush()
         return user
 
     async def update(self, user_id: UUID, user_data: UserUpdate) -> User:
@@ -67,7 +159,7 @@ class UserRepository:
         for field, value in update_data.items():
             setattr(user, field, value)
 
-        await self.session.commit()
+        await self.session.flush()
         await self.session.refresh(user)
         return user
 
@@ -75,4 +167,4 @@ class UserRepository:
         user = await self.get_by_id(user_id)
         if user:
             await self.session.delete(user)
-            await self.session.commit()
+            await self.session.flush()
@@ -1,7 +1,10 @@
 from decimal import Decimal
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import UUID
 
+from broker import ORDER_EVENTS_QUEUE
+from repositories.unit_of_work import UnitOfWork
+
 
 class OrderService:
     def __init__(
@@ -10,27 +13,63 @@ class OrderService:
         product_repository=None,
         user_repository=None,
         email_service=None,
+        unit_of_work=None,
+        outbox_repository=None,
     ):
         self.order_repository = order_repository
         self.product_repository = product_repository
         self.user_repository = user_repository
         self.email_service = email_service
+        # Репозитории не делают commit сами: без общей единицы работы
+        # записи сервиса фиксирует своя, открытая над сессией заказов
+        self.unit_of_work = unit_of_work or UnitOfWork(order_repository.session)
+        self.outbox_repository = outbox_repository or self.unit_of_work.outbox
+
+    def _transaction(self) -> UnitOfWork:
+        """Единица работы заказа: один commit на операцию или откат при ошибке"""
+        return self.unit_of_work
+
+    def _add_order_event(self, event_type: str, order, **extra) -> None:
+        """Событие заказа в outbox той же транзакции; в брокер его отправит relay"""
+        if not self.outbox_repository:
+            return
+        payload = {
+            "order_id": str(order.id),
+            "user_id": str(order.user_id),
+            "status": order.status,
+            "total_amount": str(order.total_amount),
+            **extra,
+        }
+        self.outbox_repository.add(
+            event_type, "order", order.id, payload, ORDER_EVENTS_QUEUE
+        )
 
     async def update_order_status(self, order_id: int, new_status: str):
         print(
             f"DEBUG: update_order_status called with order_id={order_id}, status={new_status}"
         )
 
-        order = await self.order_repository.get_by_id(order_id)
-        if not order:
-            raise ValueError(f"Order {order_id} not found")
+        async with self._transaction():
+            order = await self.order_repository.get_by_id(order_id, include=["user"])
+            if not order:
+                raise ValueError(f"Order {order_id} not found")
 
-        print(
-            f"DEBUG: Order found: {order.id}, user: {getattr(order, 'user', 'No user')}"
-        )
+            print(
+                f"DEBUG: Order found: {order.id}, user: {getattr(order, 'user', 'No user')}"
+            )
 
-        updated_order = await self.order_repository.update_status(order_id, new_status)
+            updated_order = await self.order_repository.update_status(
+                order_id, new_status
+            )
+            self._add_order_event(
+                "order.status_changed",
+                updated_order,
+                email=getattr(order.user, "email", None),
+                username=getattr(order.user, "username", None),
+            )
 
+        # Письмо отправляет консьюмер order.events; inline — только если
+        # сервис рассылки передан явно
         if new_status == "shipped" and self.email_service:
             print("DEBUG: Attempting to send shipping email")
             try:
@@ -58,55 +97,6 @@ class OrderService:
 
         return updated_order
 
-    async def create_order(self, order_data: Dict) -> Dict:
-        user_id = order_data["user_id"]
-        items = order_data["items"]
-
-        user = await self.user_repository.get_by_id(user_id)
-        if not user:
-            raise ValueError("User not found")
-
-        total_amount = 0
-        product_items = []
-
-        for item in items:
-            product_id = item["product_id"]
-            quantity = item["quantity"]
-
-            product = await self.product_repository.get_by_id(product_id)
-            if not product:
-                raise ValueError(f"Product {product_id} not found")
-
-            if product.stock_quantity < quantity:
-                raise ValueError(
-                    f"Insufficient stock for product {product.name}. Available: {product.stock_quantity}, requested: {quantity}"
-                )
-
-            item_total = product.price * quantity
-            total_amount += item_total
-
-            product_items.append(
-                {
-                    "product_id": product_id,
-                    "quantity": quantity,
-                    "price_at_time": product.price,
-                }
-            )
-
-        order = await self.order_repository.create(
-            user_id=user_id,
-            address_id=user_id,
-            product_items=product_items,
-            total_amount=total_amount,
-        )
-
-        return {
-            "order_id": order.id,
-            "total_amount": total_amount,
-            "status": order.status,
-            "items_count": len(items),
-        }
-
     async def get_order(self, order_id: UUID) -> Dict:
         order = await self.order_repository.get_by_id(order_id)
         if not order:
@@ -120,49 +110,152 @@ class OrderService:
             "created_at": order.created_at,
         }
 
+    async def list_orders(
+        self, count: int = 20, cursor: Optional[str] = None, **filters
+    ) -> Tuple[List[Any], Optional[str]]:
+        return await self.order_repository.get_by_keyset(count, cursor, **filters)
+
     async def create_order(self, order_data: Dict[str, Any]):
         if not order_data.get("items"):
             raise ValueError("Order must contain at least one item")
 
+        quantities: Dict[UUID, int] = {}
         for item in order_data["items"]:
             quantity = item.get("quantity", 0)
             if quantity <= 0:
                 raise ValueError("Quantity must be positive")
+            product_id = _as_uuid(item["product_id"])
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+        async with self._transaction():
+            user_id = order_data["user_id"]
+            user = await self.user_repository.get_by_id(user_id)
+            if not user:
+                raise ValueError("User not found")
+
+            # Остатки проверяются и списываются одним атомарным UPDATE в БД,
+            # поэтому параллельные заказы не могут уйти в минус
+            reserved = await self.product_repository.reserve_stock(quantities)
+            if len(reserved) < len(quantities):
+                await self._raise_reservation_error(quantities, reserved)
+
+            total_amount = Decimal("0")
+            product_items = []
+            for product_id, quantity in quantities.items():
+                item_price = Decimal(str(reserved[product_id].price))
+                total_amount += item_price * quantity
+
+                product_items.append(
+                    {
+                        "product_id": product_id,
+                        "quantity": quantity,
+                        "price_at_time": float(item_price),
+                    }
+                )
 
-        user_id = order_data["user_id"]
-        user = await self.user_repository.get_by_id(user_id)
-        if not user:
-            raise ValueError("User not found")
-
-        total_amount = Decimal("0")
-        for item in order_data["items"]:
-            product_id = item["product_id"]
-            quantity = item["quantity"]
+            order = await self.order_repository.create(
+                user_id=user_id,
+                address_id=order_data.get("address_id"),
+                product_items=product_items,
+                total_amount=float(total_amount),
+            )
+            self._add_order_event(
+                "order.created",
+                order,
+                items=[
+                    {
+                        "product_id": str(item["product_id"]),
+                        "quantity": item["quantity"],
+                    }
+                    for item in product_items
+                ],
+            )
 
-            product = await self.product_repository.get_by_id(product_id)
-            if not product:
-                raise ValueError(f"Product {product_id} not found")
+        return order
 
-            if product.stock_quantity < quantity:
-                raise ValueError(f"Insufficient stock for product {product.name}")
+    async def import_orders(self, messages: List[Any]) -> Tuple[int, List[UUID]]:
+        """Записать пачку заказов из очереди одной транзакцией
+
+        Используется для переноса и повторного проигрывания заказов: остатки
+        не списываются, события не публикуются. Заказ откладывается, если адрес
+        не принадлежит пользователю или товар неизвестен: они могут прийти
+        позже. Возвращает (вставлено, id отложенных); уже существующие заказы
+        пропускаются.
+        """
+        async with self._transaction():
+            owners = await self.user_repository.get_address_owners(
+                {message.address_id for message in messages}
+            )
+            prices = await self.product_repository.get_prices(
+                {item.product_id for message in messages for item in message.items}
+            )
 
-            item_price = Decimal(str(product.price))
-            total_amount += item_price * quantity
+            orders = []
+            items: Dict[UUID, List[Dict[str, Any]]] = {}
+            rejected = []
+            for message in messages:
+                if owners.get(message.address_id) != message.user_id or any(
+                    item.product_id not in prices for item in message.items
+                ):
+                    rejected.append(message.id)
+                    continue
+
+                quantities: Dict[UUID, int] = {}
+                for item in message.items:
+                    quantities[item.product_id] = (
+                        quantities.get(item.product_id, 0) + item.quantity
+                    )
 
-            item["price_at_time"] = float(item_price)
+                orders.append(
+                    {
+                        "id": message.id,
+                        "user_id": message.user_id,
+                        "address_id": message.address_id,
+                        "status": message.status,
+                        "total_amount": sum(
+                            prices[product_id] * quantity
+                            for product_id, quantity in quantities.items()
+                        ),
+                        "created_at": message.created_at,
+                    }
+                )
+                items[message.id] = [
+                    {
+                        "order_id": message.id,
+                        "product_id": product_id,
+                        "quantity": quantity,
+                        "price_at_time": prices[product_id],
+                    }
+                    for product_id, quantity in quantities.items()
+                ]
+
+            inserted = await self.order_repository.insert_many(orders)
+            await self.order_repository.add_items_many(
+                [item for order_id in inserted for item in items[order_id]]
+            )
 
-        order = await self.order_repository.create(
-            user_id=user_id,
-            product_items=order_data["items"],
-            total_amount=float(total_amount),
-        )
+        return len(inserted), rejected
 
-        for item in order_data["items"]:
-            product_id = item["product_id"]
-            quantity = item["quantity"]
+    async def _raise_reservation_error(
+        self, quantities: Dict[UUID, int], reserved: Dict[UUID, Any]
+    ) -> None:
+        missing = {
+            product_id: quantity
+            for product_id, quantity in quantities.items()
+            if product_id not in reserved
+        }
+        products = {
+            product.id: product
+            for product in await self.product_repository.get_many(list(missing))
+        }
+        for product_id, quantity in missing.items():
+            product = products.get(product_id)
+            if not product:
+                raise ValueError(f"Product {product_id} not found")
+            if product.stock_quantity < quantity:
+                raise ValueError(f"Insufficient stock for product {product.name}")
+        raise ValueError("Insufficient stock, please retry the order")
 
-            product = await self.product_repository.get_by_id(product_id)
-            new_stock = product.stock_quantity - quantity
-            await self.product_repository.update_stock(product_id, new_stock)
 
-        return order
+def _as_uuid(value) -> UUID:
+    return value if isinstance(value, UUID) else UUID(str(value))
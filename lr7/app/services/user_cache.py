@@ -0,0 +1,42 @@
+from typing import Optional
+from uuid import UUID
+
+from dto.user_dto import UserResponse
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+
+class UserCache:
+    """Read-through кэш профилей пользователей в Redis"""
+
+    def __init__(self, redis: Redis, ttl: int = 300, prefix: str = "user:"):
+        self.redis = redis
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, user_id: UUID) -> str:
+        return f"{self.prefix}{user_id}"
+
+    async def get(self, user_id: UUID) -> Optional[UserResponse]:
+        try:
+            payload = await self.redis.get(self._key(user_id))
+        except RedisError as e:
+            print(f"Redis недоступен, читаем из БД: {e}")
+            return None
+        if payload is None:
+            return None
+        return UserResponse.model_validate_json(payload)
+
+    async def set(self, user: UserResponse) -> None:
+        try:
+            await self.redis.set(
+                self._key(user.id), user.model_dump_json(), ex=self.ttl
+            )
+        except RedisError as e:
+            print(f"Не удалось записать пользователя {user.id} в кэш: {e}")
+
+    async def invalidate(self, user_id: UUID) -> None:
+        try:
+            await self.redis.delete(self._key(user_id))
+        except RedisError as e:
+            print(f"Не удалось сбросить кэш пользователя {user_id}: {e}")
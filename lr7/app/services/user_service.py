@@ -1,33 +1,82 @@
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from uuid import UUID
 
-from dto.user_dto import UserCreate, UserUpdate
+from db_router import is_replica_session
+from dto.user_dto import UserCreate, UserResponse, UserUpdate
 from models import User
+from repositories.unit_of_work import UnitOfWork
 from repositories.user_repository import UserRepository
+from services.user_cache import UserCache
+from sqlalchemy import Row
 
 
 class UserService:
-    def __init__(self, user_repository: UserRepository):
+    def __init__(
+        self,
+        user_repository: UserRepository,
+        unit_of_work: Optional[UnitOfWork] = None,
+        user_cache: Optional[UserCache] = None,
+    ):
         self.user_repository = user_repository
+        # Без общей единицы работы записи фиксирует своя над сессией репозитория
+        self.unit_of_work = unit_of_work or UnitOfWork(user_repository.session)
+        self.user_cache = user_cache
 
-    async def get_by_id(self, user_id: UUID) -> User | None:
-        return await self.user_repository.get_by_id(user_id)
+    def _transaction(self) -> UnitOfWork:
+        return self.unit_of_work
+
+    async def get_by_id(self, user_id: UUID) -> User | UserResponse | None:
+        if self.user_cache:
+            cached = await self.user_cache.get(user_id)
+            if cached:
+                return cached
+
+        user = await self.user_repository.get_by_id(user_id)
+        # Строка с реплики могла отстать: в кэш её не кладём
+        if (
+            user
+            and self.user_cache
+            and not is_replica_session(self.user_repository.session)
+        ):
+            await self.user_cache.set(UserResponse.model_validate(user))
+        return user
 
     async def get_by_filter_with_count(
-        self, count: int = 10, page: int = 1, **kwargs
-    ) -> Tuple[List[User], int]:
+        self,
+        count: int = 10,
+        page: int = 1,
+        include_total: bool = True,
+        estimate_total: bool = False,
+        **kwargs,
+    ) -> Tuple[List[Row], Optional[int]]:
         return await self.user_repository.get_by_filter_with_count(
-            count, page, **kwargs
+            count, page, include_total, estimate_total, **kwargs
         )
 
+    async def get_by_keyset(
+        self, count: int = 10, cursor: Optional[str] = None, **kwargs
+    ) -> Tuple[List[Row], Optional[str]]:
+        return await self.user_repository.get_by_keyset(count, cursor, **kwargs)
+
+    async def search(self, term: str, count: int = 10) -> List[Row]:
+        return await self.user_repository.search(term, count)
+
     async def create_user(self, user_data: UserCreate) -> User:
-        existing = await self.user_repository.get_by_email(user_data.email)
-        if existing:
-            raise ValueError(f"User with email {user_data.email} already exists")
-        return await self.user_repository.create(**user_data.model_dump())
+        async with self._transaction():
+            existing = await self.user_repository.get_by_email(user_data.email)
+            if existing:
+                raise ValueError(f"User with email {user_data.email} already exists")
+            return await self.user_repository.create(**user_data.model_dump())
 
     async def update(self, user_id: UUID, user_data: UserUpdate) -> User:
-        return await self.user_repository.update(user_id, user_data)
+        async with self._transaction():
+            user = await self.user_repository.update(user_id, user_data)
+        if self.user_cache:
+            await self.user_cache.invalidate(user_id)
+        return user
 
     async def delete(self, user_id: UUID) -> None:
-        await self.user_repository.delete(user_id)
+        async with self._transaction():
+            await self.user_repository.delete(user_id)
+        if self.user_cache:
+            await self.user_cache.invalidate(user_id)
@@ -0,0 +1,112 @@
+"""Размер и стоимость кодирования сообщений брокера в разных форматах.
+
+Старый путь producer_pika: json.dumps на каждое сообщение (и ещё раз с
+indent=2 для печати). Новые варианты из message_codecs: компактный JSON
+через orjson, MessagePack и конверт из пачки заказов, при размере от
+ZSTD_MIN_SIZE сжатый zstd. Брокер не нужен — меряется только CPU и байты.
+
+    python benchmarks/codec_bench.py --batch-size 100 --repeat 2000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from message_codecs import (  # noqa: E402
+    decode_message,
+    encode_batch,
+    encode_message,
+    get_codec,
+)
+
+
+def make_orders(count: int) -> list:
+    user_id = str(uuid.uuid4())
+    address_id = str(uuid.uuid4())
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "address_id": address_id,
+            "items": [{"product_id": str(uuid.uuid4()), "quantity": i % 3 + 1}],
+            "status": "pending",
+            "created_at": datetime.now().isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+def stdlib_json(orders: list):
+    bodies = [json.dumps(order, ensure_ascii=False).encode() for order in orders]
+    return bodies, lambda: [json.loads(body) for body in bodies]
+
+
+def per_message(codec_name: str):
+    codec = get_codec(codec_name)
+
+    def encode(orders: list):
+        encoded = [encode_message(order, codec) for order in orders]
+        return [message.body for message in encoded], lambda: [
+            decode_message(m.body, m.content_type, m.content_encoding, m.headers)
+            for m in encoded
+        ]
+
+    return encode
+
+
+def envelope(codec_name: str, compress: bool):
+    codec = get_codec(codec_name)
+
+    def encode(orders: list):
+        m = encode_batch(orders, codec, compress=compress)
+        return [m.body], lambda: decode_message(
+            m.body, m.content_type, m.content_encoding, m.headers
+        )
+
+    return encode
+
+
+MODES = {
+    "json.dumps по одному": stdlib_json,
+    "orjson по одному": per_message("json"),
+    "msgpack по одному": per_message("msgpack"),
+    "конверт orjson": envelope("json", compress=False),
+    "конверт orjson + zstd": envelope("json", compress=True),
+    "конверт msgpack + zstd": envelope("msgpack", compress=True),
+}
+
+
+def measure(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1_000_000
+
+
+def run(batch_size: int, repeat: int) -> None:
+    orders = make_orders(batch_size)
+    pretty = sum(len(json.dumps(order, indent=2).encode()) for order in orders)
+
+    print(f"Пачка из {batch_size} заказов, {repeat} повторов\n")
+    print(f"{'формат':<24} {'байт/сообщ':>10} {'encode мкс':>11} {'decode мкс':>11}")
+    print(f"{'json.dumps indent=2':<24} {pretty / batch_size:10.1f}")
+    for title, func in MODES.items():
+        bodies, decode = func(orders)
+        size = sum(len(body) for body in bodies) / batch_size
+        encode_us = measure(lambda: func(orders), repeat)
+        decode_us = measure(decode, repeat)
+        print(f"{title:<24} {size:10.1f} {encode_us:11.1f} {decode_us:11.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.batch_size, args.repeat)
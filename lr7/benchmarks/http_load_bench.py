@@ -0,0 +1,72 @@
+"""Нагрузочный замер запросов в секунду для запущенного приложения.
+
+Сравнение эха SQL и размеров пула:
+
+    DB_ECHO=true  python app/main.py   # в одном терминале
+    python benchmarks/http_load_bench.py --path "/users?count=20" --duration 20
+
+    DB_ECHO=false DB_POOL_SIZE=20 python app/main.py
+    python benchmarks/http_load_bench.py --path "/users?count=20" --duration 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def worker(client: httpx.AsyncClient, path: str, deadline: float, stats: dict):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                stats["errors"] += 1
+        except httpx.HTTPError:
+            stats["errors"] += 1
+        stats["latencies"].append(time.perf_counter() - start)
+
+
+async def run(base_url: str, path: str, concurrency: int, duration: float) -> None:
+    stats = {"latencies": [], "errors": 0}
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+        # Прогрев пула соединений приложения и кэша подготовленных выражений
+        await asyncio.gather(*(client.get(path) for _ in range(concurrency)))
+
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(worker(client, path, deadline, stats) for _ in range(concurrency))
+        )
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(stats["latencies"])
+    if not latencies:
+        print("Нет ни одного ответа")
+        return
+
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(f"GET {path}, конкурентность {concurrency}, {elapsed:.1f} с")
+    print(f"Запросов: {len(latencies)}, ошибок: {stats['errors']}")
+    print(f"RPS: {len(latencies) / elapsed:.1f}")
+    print(
+        f"Задержка, мс: среднее {statistics.mean(latencies) * 1000:.1f}, "
+        f"p50 {percentile(0.50):.1f}, p95 {percentile(0.95):.1f}, "
+        f"p99 {percentile(0.99):.1f}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/users?count=20")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=15.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.base_url, args.path, args.concurrency, args.duration))
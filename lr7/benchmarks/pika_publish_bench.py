@@ -0,0 +1,106 @@
+"""Пропускная способность публикации в RabbitMQ: соединение на сообщение против пула.
+
+Нужен локальный RabbitMQ (docker compose up rabbitmq). Сравниваются:
+старый send_message (соединение и queue_declare на каждое сообщение),
+PikaPublisher.publish (долгоживущее соединение, confirm на сообщение) и
+PikaPublisher.publish_batch (пачка публикуется целиком, confirm ждётся
+один раз на пачку).
+
+    python benchmarks/pika_publish_bench.py --messages 5000 --batch-size 500
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+import pika
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from pika_publisher import RABBITMQ_URL, PikaPublisher  # noqa: E402
+
+QUEUE = "bench_pika_publish"
+
+
+def make_messages(count: int) -> list:
+    return [
+        {"id": str(uuid.uuid4()), "name": f"Product {i}", "price": 99.99}
+        for i in range(count)
+    ]
+
+
+def connection_per_message(parameters, messages: list, batch_size: int) -> None:
+    for message in messages:
+        connection = pika.BlockingConnection(parameters)
+        channel = connection.channel()
+        channel.queue_declare(queue=QUEUE, durable=True)
+        channel.basic_publish(
+            exchange="",
+            routing_key=QUEUE,
+            body=json.dumps(message, ensure_ascii=False),
+            properties=pika.BasicProperties(
+                content_type="application/json", delivery_mode=2
+            ),
+        )
+        connection.close()
+
+
+def pooled_confirm(parameters, messages: list, batch_size: int) -> None:
+    publisher = PikaPublisher(parameters)
+    for message in messages:
+        publisher.publish(QUEUE, message)
+    publisher.close()
+
+
+def pooled_batch(parameters, messages: list, batch_size: int) -> None:
+    publisher = PikaPublisher(parameters)
+    for start in range(0, len(messages), batch_size):
+        publisher.publish_batch(QUEUE, messages[start : start + batch_size])
+    publisher.close()
+
+
+MODES = {
+    "соединение на сообщение": connection_per_message,
+    "пул + confirm": pooled_confirm,
+    "пул + пачки (confirm)": pooled_batch,
+}
+
+
+def purge(parameters) -> None:
+    connection = pika.BlockingConnection(parameters)
+    channel = connection.channel()
+    channel.queue_declare(queue=QUEUE, durable=True)
+    channel.queue_purge(QUEUE)
+    connection.close()
+
+
+def run(url: str, count: int, batch_size: int, skip_slow: bool) -> None:
+    parameters = pika.URLParameters(url)
+    messages = make_messages(count)
+
+    print(f"{count} сообщений, пачка {batch_size}\n")
+    for title, func in MODES.items():
+        if skip_slow and func is connection_per_message:
+            continue
+        purge(parameters)
+        start = time.perf_counter()
+        func(parameters, messages, batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"{title:<26} {elapsed:8.2f} с  {count / elapsed:10,.0f} сообщ/с")
+
+    purge(parameters)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default=RABBITMQ_URL)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument(
+        "--skip-slow", action="store_true", help="без варианта соединение-на-сообщение"
+    )
+    args = parser.parse_args()
+    run(args.url, args.messages, args.batch_size, args.skip_slow)
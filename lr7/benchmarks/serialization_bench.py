@@ -0,0 +1,107 @@
+"""Сравнение сериализации страницы пользователей: ORM + pydantic против строк + msgspec.
+
+Старый путь: select(User) -> ORM-объекты -> UserResponse.model_validate ->
+UsersResponse (pydantic) -> JSON-кодировщик Litestar. Новый путь: select по
+колонкам -> Row -> msgspec.convert -> UsersResponse (msgspec.Struct) -> JSON.
+БД — SQLite в памяти, чтобы мерить только CPU на стороне приложения.
+
+    python benchmarks/serialization_bench.py --page-size 100 --repeat 2000
+"""
+
+import argparse
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+import msgspec
+from litestar.plugins.pydantic import PydanticInitPlugin
+from litestar.serialization import encode_json, get_serializer
+from pydantic import BaseModel
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from dto.user_dto import UserResponse, UsersResponse, to_user_items  # noqa: E402
+from models import User  # noqa: E402
+from repositories.user_repository import UserRepository  # noqa: E402
+
+# Те же энкодеры, что Litestar подключает для pydantic-моделей в ответах
+PYDANTIC_SERIALIZER = get_serializer(PydanticInitPlugin.encoders())
+
+
+class PydanticUsersResponse(BaseModel):
+    """UsersResponse в том виде, в каком он был до перехода на msgspec"""
+
+    users: List[UserResponse]
+    total_count: Optional[int] = None
+    page: Optional[int] = None
+    page_size: int
+    total_pages: Optional[int] = None
+
+
+def orm_pydantic(session: Session, page_size: int) -> bytes:
+    users = session.execute(select(User).limit(page_size)).scalars().all()
+    response = PydanticUsersResponse(
+        users=[UserResponse.model_validate(user) for user in users],
+        page=1,
+        page_size=page_size,
+    )
+    session.expunge_all()
+    return encode_json(response, serializer=PYDANTIC_SERIALIZER)
+
+
+def rows_msgspec(session: Session, page_size: int) -> bytes:
+    rows = session.execute(select(*UserRepository.LIST_COLUMNS).limit(page_size)).all()
+    response = UsersResponse(users=to_user_items(rows), page=1, page_size=page_size)
+    return msgspec.json.encode(response)
+
+
+def measure(title: str, func, session: Session, page_size: int, repeat: int) -> float:
+    func(session, page_size)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(session, page_size)
+    per_call = (time.perf_counter() - start) / repeat * 1_000_000
+    print(f"{title:<28} {per_call:10.1f} мкс/страница")
+    return per_call
+
+
+def run(page_size: int, repeat: int) -> None:
+    engine = create_engine("sqlite://")
+    User.__table__.create(engine)
+
+    with Session(engine) as session:
+        session.execute(
+            insert(User),
+            [
+                {
+                    "id": uuid.uuid4(),
+                    "username": f"user_{i}",
+                    "email": f"user_{i}@example.com",
+                    "description": "x" * 40,
+                    "created_at": datetime.now(),
+                    "updated_at": datetime.now(),
+                }
+                for i in range(page_size)
+            ],
+        )
+        session.commit()
+
+        print(f"Страница из {page_size} пользователей, {repeat} повторов\n")
+        old = measure("ORM + pydantic", orm_pydantic, session, page_size, repeat)
+        new = measure("Row + msgspec", rows_msgspec, session, page_size, repeat)
+        print(f"\nУскорение: x{old / new:.2f}")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.page_size, args.repeat)
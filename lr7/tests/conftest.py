@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from models import Address, Base, Order, Product, User, order_product_association
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.pool import StaticPool
+
+TEST_DATABASE_URL = "sqlite+aiosqlite://"
+
+
+@compiles(JSONB, "sqlite")
+def _compile_jsonb_sqlite(type_, compiler, **kw):
+    # В SQLite JSONB хранится как обычный JSON
+    return "JSON"
+
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine(TEST_DATABASE_URL, poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest.fixture
+async def session(session_factory):
+    async with session_factory() as session:
+        yield session
+
+
+@pytest.fixture
+async def orders(session):
+    """Десять заказов одного пользователя по две позиции, от старых к новым"""
+    user = User(username="buyer", email="buyer@example.com")
+    address = Address(user=user, street="Main St", city="Moscow", country="RU")
+    products = [
+        Product(name=f"Product {i}", price=Decimal("10.00"), stock_quantity=100)
+        for i in range(3)
+    ]
+    start = datetime(2024, 1, 1)
+    orders = [
+        Order(
+            user=user,
+            address=address,
+            status="shipped" if i % 2 else "pending",
+            total_amount=Decimal("30.00"),
+            created_at=start + timedelta(hours=i),
+        )
+        for i in range(10)
+    ]
+    session.add_all([*products, *orders])
+    await session.flush()
+    await session.execute(
+        insert(order_product_association),
+        [
+            {
+                "order_id": order.id,
+                "product_id": product.id,
+                "quantity": 1 + j,
+                "price_at_time": product.price,
+            }
+            for order in orders
+            for j, product in enumerate(products[:2])
+        ],
+    )
+    await session.commit()
+    session.expunge_all()
+    return orders
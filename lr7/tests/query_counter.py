@@ -0,0 +1,47 @@
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class QueryCounter:
+    """Счётчик SQL-выражений движка для поиска N+1
+
+        with QueryCounter(engine, budget=3):
+            await order_service.update_order_status(order_id, "shipped")
+
+    При выходе из блока бросает AssertionError, если выражений больше бюджета.
+    """
+
+    def __init__(self, engine: AsyncEngine | Engine, budget: Optional[int] = None):
+        self.engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+        self.budget = budget
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+        if exc_type is None and self.budget is not None and self.count > self.budget:
+            listing = "\n".join(
+                f"{number}. {statement}"
+                for number, statement in enumerate(self.statements, 1)
+            )
+            raise AssertionError(
+                f"Expected at most {self.budget} SQL statements, "
+                f"got {self.count}:\n{listing}"
+            )
+
+
+def assert_max_queries(engine: AsyncEngine | Engine, budget: int) -> QueryCounter:
+    return QueryCounter(engine, budget=budget)
@@ -0,0 +1,60 @@
+import pytest
+from bulk_loader import (
+    COLUMNS,
+    TABLE_ORDER,
+    LoadPlan,
+    generate_products,
+    generate_users,
+)
+from dto.order_dto import OrderResponse
+from dto.user_dto import UserResponse
+from models import Base
+from repositories.order_repository import OrderRepository
+from repositories.user_repository import UserRepository
+from sqlalchemy import insert
+
+PLAN = LoadPlan(
+    users=3,
+    addresses_per_user=2,
+    products=5,
+    orders_per_user=2,
+    items_per_order=2,
+    chunk_size=10,
+    seed=42,
+)
+
+
+@pytest.fixture
+async def loaded(session):
+    rows = generate_products(PLAN, 0, PLAN.products)
+    rows.update(generate_users(PLAN, 0, PLAN.users))
+    for table in TABLE_ORDER:
+        await session.execute(
+            insert(Base.metadata.tables[table]),
+            [dict(zip(COLUMNS[table], record)) for record in rows[table]],
+        )
+    await session.commit()
+    return rows
+
+
+class TestBulkLoaderIds:
+    def test_ids_are_deterministic_version_4(self):
+        first = PLAN.make_id("user", 7)
+
+        assert first == PLAN.make_id("user", 7)
+        assert first.version == 4
+        assert first != PLAN.make_id("order", 7)
+
+    async def test_loaded_users_serialize(self, session, loaded):
+        repository = UserRepository(session)
+
+        for record in loaded["users"]:
+            user = await repository.get_by_id(record[0])
+            assert UserResponse.model_validate(user).id == record[0]
+
+    async def test_loaded_orders_serialize(self, session, loaded):
+        orders, _ = await OrderRepository(session).get_by_keyset(20)
+
+        responses = [OrderResponse.model_validate(order) for order in orders]
+
+        assert len(responses) == PLAN.users * PLAN.orders_per_user
@@ -0,0 +1,47 @@
+from datetime import timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+from controllers.order_controller import OrderController
+from litestar import Litestar
+from litestar.di import Provide
+from litestar.testing import TestClient
+from services.order_service import OrderService
+
+
+@pytest.fixture
+def order_service():
+    service = AsyncMock(spec=OrderService)
+    service.list_orders.return_value = ([], None)
+    return service
+
+
+@pytest.fixture
+def client(order_service):
+    async def provide_order_service():
+        return order_service
+
+    app = Litestar(
+        route_handlers=[OrderController],
+        dependencies={"order_service": Provide(provide_order_service)},
+    )
+    with TestClient(app) as client:
+        yield client
+
+
+class TestOrderListParameters:
+    @pytest.mark.parametrize("count", [0, -1, 101])
+    def test_invalid_count_is_rejected(self, client, order_service, count):
+        response = client.get(f"/orders?count={count}")
+
+        assert response.status_code == 400
+        order_service.list_orders.assert_not_called()
+
+    def test_aware_period_is_accepted(self, client, order_service):
+        response = client.get(
+            "/orders", params={"created_from": "2024-01-01T00:00:00+03:00"}
+        )
+
+        assert response.status_code == 200
+        created_from = order_service.list_orders.await_args.kwargs["created_from"]
+        assert created_from.utcoffset() == timedelta(hours=3)
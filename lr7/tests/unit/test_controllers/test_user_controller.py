@@ -0,0 +1,60 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from controllers.user_controller import UserController
+from litestar import Litestar
+from litestar.di import Provide
+from litestar.testing import TestClient
+from services.user_service import UserService
+
+
+@pytest.fixture
+def user_service():
+    service = AsyncMock(spec=UserService)
+    service.get_by_keyset.return_value = ([], None)
+    service.get_by_filter_with_count.return_value = ([], 0)
+    service.search.return_value = []
+    return service
+
+
+@pytest.fixture
+def client(user_service):
+    async def provide_user_service():
+        return user_service
+
+    app = Litestar(
+        route_handlers=[UserController],
+        dependencies={"user_service": Provide(provide_user_service)},
+    )
+    with TestClient(app) as client:
+        yield client
+
+
+class TestUserListParameters:
+    @pytest.mark.parametrize(
+        "query",
+        [
+            "count=0&keyset=true",
+            "count=-5&keyset=true",
+            "count=101",
+            "page=0",
+        ],
+    )
+    def test_invalid_page_is_rejected(self, client, user_service, query: str):
+        response = client.get(f"/users?{query}")
+
+        assert response.status_code == 400
+        user_service.get_by_keyset.assert_not_called()
+        user_service.get_by_filter_with_count.assert_not_called()
+
+    def test_search_count_is_bounded(self, client, user_service):
+        response = client.get("/users/search?q=john&count=0")
+
+        assert response.status_code == 400
+        user_service.search.assert_not_called()
+
+    def test_keyset_page(self, client, user_service):
+        response = client.get("/users?count=100&keyset=true")
+
+        assert response.status_code == 200
+        user_service.get_by_keyset.assert_awaited_once_with(100, None)
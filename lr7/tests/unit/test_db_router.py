@@ -0,0 +1,107 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from db_router import STICKY_COOKIE, SessionRouter, is_replica_session
+from litestar.datastructures import MutableScopeHeaders
+from sqlalchemy.ext.asyncio import create_async_engine
+
+
+@pytest.fixture
+async def router():
+    router = SessionRouter(
+        create_async_engine("sqlite+aiosqlite://"),
+        [create_async_engine("sqlite+aiosqlite://") for _ in range(2)],
+        sticky_seconds=5,
+    )
+    yield router
+    await router.dispose()
+
+
+def make_request(method="GET", cookies=None, **opt):
+    return SimpleNamespace(
+        method=method,
+        cookies=cookies or {},
+        route_handler=SimpleNamespace(opt=opt),
+        scope={},
+    )
+
+
+def response_start(status=200):
+    return {"type": "http.response.start", "status": status, "headers": []}
+
+
+class TestSessionRouting:
+    def test_reads_go_round_robin_over_replicas(self, router):
+        factories = [router.session_factory(make_request()) for _ in range(4)]
+
+        first, second = router.replica_factories
+        assert factories == [first, second, first, second]
+
+    def test_writes_go_to_primary(self, router):
+        request = make_request("POST")
+
+        assert router.session_factory(request) is router.primary_factory
+        assert request.scope["state"]["db_wrote"] is True
+
+    def test_use_primary_opt_pins_read_to_primary(self, router):
+        request = make_request(use_primary=True)
+
+        assert router.session_factory(request) is router.primary_factory
+        assert "state" not in request.scope
+
+    def test_sticky_cookie_pins_reads_to_primary(self, router):
+        cookies = {STICKY_COOKIE: str(time.time() + 5)}
+
+        assert router.session_factory(make_request(cookies=cookies)) is (
+            router.primary_factory
+        )
+
+    @pytest.mark.parametrize("value", [str(time.time() - 1), "garbage"])
+    def test_expired_or_invalid_cookie_reads_replica(self, router, value):
+        factory = router.session_factory(make_request(cookies={STICKY_COOKIE: value}))
+
+        assert factory in router.replica_factories
+
+    async def test_without_replicas_everything_reads_primary(self):
+        router = SessionRouter(create_async_engine("sqlite+aiosqlite://"))
+
+        assert router.session_factory(make_request()) is router.primary_factory
+        await router.dispose()
+
+    def test_replica_sessions_are_marked(self, router):
+        assert is_replica_session(router.replica_factories[0]())
+        assert not is_replica_session(router.primary_factory())
+
+
+class TestStickyCookie:
+    async def test_successful_write_sets_cookie(self, router):
+        request = make_request("POST")
+        router.session_factory(request)
+        message = response_start(201)
+
+        await router.mark_primary_sticky(message, request.scope)
+
+        [cookie] = MutableScopeHeaders.from_message(message).getall("set-cookie")
+        name, value = cookie.split(";")[0].split("=")
+        assert name == STICKY_COOKIE
+        assert time.time() < float(value) <= time.time() + 5
+        assert "HttpOnly" in cookie
+
+    async def test_failed_write_sets_no_cookie(self, router):
+        request = make_request("POST")
+        router.session_factory(request)
+        message = response_start(422)
+
+        await router.mark_primary_sticky(message, request.scope)
+
+        assert message["headers"] == []
+
+    async def test_read_sets_no_cookie(self, router):
+        request = make_request()
+        router.session_factory(request)
+        message = response_start()
+
+        await router.mark_primary_sticky(message, request.scope)
+
+        assert message["headers"] == []
@@ -0,0 +1,201 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import consumers
+import pytest
+from consumers import MicroBatchConsumer, message_key
+from dedup import MessageDeduplicator, PostgresDedupStore, RedisDedupStore
+from fakeredis import FakeAsyncRedis
+from redis.exceptions import ConnectionError
+from sqlalchemy.dialects import postgresql
+
+
+@pytest.fixture
+async def redis():
+    redis = FakeAsyncRedis()
+    yield redis
+    await redis.aclose()
+
+
+@pytest.fixture
+def store(redis):
+    return RedisDedupStore(redis)
+
+
+def deduplicator(store):
+    return MessageDeduplicator(store, ttl=60, processing_ttl=30)
+
+
+class TestRedisDedupStore:
+    async def test_claim_confirm_marks_duplicate(self, store, redis):
+        first, second = deduplicator(store), deduplicator(store)
+
+        assert await first.claim(["a", "b"]) == ({"a", "b"}, set())
+        await first.confirm(["a", "b"])
+
+        assert await second.claim(["a", "b", "c"]) == ({"c"}, set())
+        assert second.duplicates == 2
+        assert await redis.get("dedup:a") == b"done"
+        assert 0 < await redis.ttl("dedup:a") <= 60
+
+    async def test_unconfirmed_claim_of_other_owner_is_busy(self, store):
+        crashed, other = deduplicator(store), deduplicator(store)
+        await crashed.claim(["a"])
+
+        assert await other.claim(["a"]) == (set(), {"a"})
+        assert other.duplicates == 0
+
+    async def test_owner_reclaims_its_unconfirmed_key(self, store):
+        consumer = deduplicator(store)
+        await consumer.claim(["a"])
+
+        assert await consumer.claim(["a"]) == ({"a"}, set())
+
+    async def test_expired_processing_claim_can_be_taken(self, store, redis):
+        crashed, other = deduplicator(store), deduplicator(store)
+        await crashed.claim(["a"])
+        await redis.delete("dedup:a")  # истёк processing_ttl
+
+        assert await other.claim(["a"]) == ({"a"}, set())
+
+    async def test_release_only_drops_own_claims(self, store):
+        first, second = deduplicator(store), deduplicator(store)
+        await first.claim(["a"])
+
+        await second.release(["a"])
+        assert await second.claim(["a"]) == (set(), {"a"})
+
+        await first.release(["a"])
+        assert await second.claim(["a"]) == ({"a"}, set())
+
+
+class TestMessageDeduplicator:
+    async def test_confirmed_keys_are_served_from_window(self):
+        store = MagicMock()
+        store.claim = AsyncMock(return_value=({"a"}, set()))
+        store.confirm = AsyncMock()
+        dedup = deduplicator(store)
+        await dedup.claim(["a"])
+        await dedup.confirm(["a"])
+
+        assert await dedup.claim(["a"]) == (set(), set())
+        assert store.claim.await_count == 1
+
+    async def test_store_errors_treat_messages_as_new(self):
+        store = MagicMock()
+        store.claim = AsyncMock(side_effect=ConnectionError("down"))
+
+        assert await deduplicator(store).claim(["a", "b"]) == ({"a", "b"}, set())
+
+
+class TestPostgresDedupStore:
+    @pytest.fixture
+    def session(self):
+        session = MagicMock()
+        session.execute = AsyncMock(
+            return_value=MagicMock(**{"scalars.return_value.all.return_value": []})
+        )
+        session.commit = AsyncMock()
+        session.__aenter__ = AsyncMock(return_value=session)
+        session.__aexit__ = AsyncMock(return_value=None)
+        return session
+
+    def statements(self, session):
+        return [
+            str(call.args[0].compile(dialect=postgresql.dialect()))
+            for call in session.execute.await_args_list
+        ]
+
+    async def test_claim_takes_expired_or_own_marks(self, session):
+        store = PostgresDedupStore(lambda: session)
+
+        await store.claim(["a"], 30, "owner-1")
+
+        insert_sql, busy_sql = self.statements(session)
+        assert "ON CONFLICT (message_id) DO UPDATE" in insert_sql
+        assert "processed_messages.owner = %(owner_1)s" in insert_sql
+        assert "processed_messages.owner IS NOT NULL" in busy_sql
+
+    async def test_confirm_and_release_are_scoped_to_owner(self, session):
+        store = PostgresDedupStore(lambda: session)
+
+        await store.confirm(["a"], 60, "owner-1")
+        await store.release(["a"], "owner-1")
+
+        confirm_sql, release_sql = self.statements(session)
+        assert "SET owner=%(owner)s" in confirm_sql
+        assert "processed_messages.owner = %(owner_1)s" in confirm_sql
+        assert "processed_messages.owner = %(owner_1)s" in release_sql
+
+
+def make_message(number: int, **fields):
+    message = dict(
+        body=b'{"id": "product-1"}',
+        headers={},
+        content_type="application/json",
+        content_encoding=None,
+        message_id=f"m{number}",
+        ack=AsyncMock(),
+        nack=AsyncMock(),
+    )
+    return SimpleNamespace(**{**message, **fields})
+
+
+class TestConsumerDeduplication:
+    def test_key_ignores_entity_id_in_body(self):
+        assert message_key(make_message(1)) == "m1"
+        assert message_key(make_message(1, message_id="")) is None
+
+    async def test_messages_in_flight_elsewhere_are_requeued_after_pause(
+        self, store, monkeypatch
+    ):
+        crashed = deduplicator(store)
+        await crashed.claim(["m2"])
+        handler = AsyncMock()
+        consumer = MicroBatchConsumer(
+            "product", handler, dedup=deduplicator(store), retry_delay=0.5
+        )
+        batch = [make_message(1), make_message(2), make_message(3)]
+        consumer._buffer = list(batch)
+        steps = []
+        batch[2].ack.side_effect = lambda **kwargs: steps.append("ack")
+        batch[1].nack.side_effect = lambda **kwargs: steps.append("nack")
+
+        async def sleep(delay):
+            steps.append(f"sleep {delay}")
+
+        monkeypatch.setattr(consumers.asyncio, "sleep", sleep)
+
+        await consumer.flush()
+
+        assert handler.await_args.args[0] == [batch[0], batch[2]]
+        batch[1].nack.assert_awaited_once_with(requeue=True)
+        batch[1].ack.assert_not_called()
+        batch[2].ack.assert_awaited_once_with(multiple=True)
+        # Пачка подтверждается сразу, занятое сообщение возвращается после паузы
+        assert steps == ["ack", "sleep 0.5", "nack"]
+
+    async def test_busy_last_message_is_not_acked(self, store):
+        await deduplicator(store).claim(["m2"])
+        consumer = MicroBatchConsumer(
+            "product", AsyncMock(), dedup=deduplicator(store), retry_delay=0
+        )
+        batch = [make_message(1), make_message(2)]
+        consumer._buffer = list(batch)
+
+        await consumer.flush()
+
+        batch[0].ack.assert_awaited_once_with(multiple=True)
+        batch[1].ack.assert_not_called()
+        batch[1].nack.assert_awaited_once_with(requeue=True)
+
+    async def test_product_updates_with_same_entity_id_are_kept(self, store):
+        handler = AsyncMock()
+        consumer = MicroBatchConsumer("product", handler, dedup=deduplicator(store))
+        consumer._buffer = [make_message(1)]
+        await consumer.flush()
+        consumer._buffer = [make_message(2)]
+
+        await consumer.flush()
+
+        assert handler.await_count == 2
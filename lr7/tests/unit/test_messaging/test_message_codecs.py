@@ -0,0 +1,118 @@
+from datetime import datetime
+from decimal import Decimal
+from uuid import UUID
+
+import orjson
+import pytest
+from message_codecs import (
+    BATCH_HEADER,
+    SCHEMA_VERSION,
+    SCHEMA_VERSION_HEADER,
+    ZSTD_MIN_SIZE,
+    JsonCodec,
+    MsgpackCodec,
+    UnsupportedMessageError,
+    decode_message,
+    encode_batch,
+    encode_message,
+    get_codec,
+)
+
+PRODUCT = {
+    "id": UUID("0b6f5a3e-6a0e-4a5e-9a8e-3f6b1c2d4e5f"),
+    "name": "Product",
+    "price": Decimal("10.50"),
+    "created_at": datetime(2024, 1, 1, 12, 30),
+}
+# Так значения выглядят после декодирования любым кодеком
+DECODED = {
+    "id": "0b6f5a3e-6a0e-4a5e-9a8e-3f6b1c2d4e5f",
+    "name": "Product",
+    "price": "10.50",
+    "created_at": "2024-01-01T12:30:00",
+}
+
+CODECS = [JsonCodec(), MsgpackCodec()]
+
+
+def decode(encoded):
+    return decode_message(
+        encoded.body, encoded.content_type, encoded.content_encoding, encoded.headers
+    )
+
+
+@pytest.mark.parametrize("codec", CODECS, ids=["json", "msgpack"])
+class TestRoundTrip:
+    def test_single_message(self, codec):
+        encoded = encode_message(PRODUCT, codec)
+
+        assert encoded.content_type == codec.content_type
+        assert encoded.headers == {SCHEMA_VERSION_HEADER: SCHEMA_VERSION}
+        assert decode(encoded) == [DECODED]
+
+    def test_small_envelope_stays_plain(self, codec):
+        encoded = encode_batch([PRODUCT, PRODUCT], codec)
+
+        assert encoded.content_encoding is None
+        assert encoded.headers[BATCH_HEADER] is True
+        assert decode(encoded) == [DECODED, DECODED]
+
+    def test_large_envelope_is_compressed(self, codec):
+        values = [PRODUCT] * (ZSTD_MIN_SIZE // 50 + 1)
+
+        encoded = encode_batch(values, codec)
+
+        assert encoded.content_encoding == "zstd"
+        assert len(encoded.body) < len(codec.encode(values))
+        assert decode(encoded) == [DECODED] * len(values)
+
+    def test_compression_can_be_disabled(self, codec):
+        values = [PRODUCT] * (ZSTD_MIN_SIZE // 50 + 1)
+
+        encoded = encode_batch(values, codec, compress=False)
+
+        assert encoded.content_encoding is None
+        assert decode(encoded) == [DECODED] * len(values)
+
+
+class TestContentTypeDispatch:
+    def test_body_is_decoded_by_its_content_type(self):
+        body = MsgpackCodec().encode({"id": 1})
+
+        assert decode_message(body, "application/msgpack") == [{"id": 1}]
+        with pytest.raises(ValueError):
+            decode_message(body, "application/json")
+
+    def test_missing_content_type_means_json(self):
+        assert decode_message(orjson.dumps({"id": 1})) == [{"id": 1}]
+
+    def test_content_type_parameters_are_ignored(self):
+        body = orjson.dumps({"id": 1})
+
+        assert decode_message(body, "application/json; charset=utf-8") == [{"id": 1}]
+
+    def test_get_codec_accepts_name_or_content_type(self):
+        assert isinstance(get_codec("msgpack"), MsgpackCodec)
+        assert isinstance(get_codec("application/json"), JsonCodec)
+        with pytest.raises(UnsupportedMessageError):
+            get_codec("xml")
+
+
+class TestRejectedMessages:
+    def test_newer_schema_version(self):
+        encoded = encode_message(PRODUCT, schema_version=SCHEMA_VERSION + 1)
+
+        with pytest.raises(UnsupportedMessageError, match="Версия схемы"):
+            decode(encoded)
+
+    def test_unknown_content_type(self):
+        with pytest.raises(UnsupportedMessageError, match="content-type"):
+            decode_message(b"<id>1</id>", "application/xml")
+
+    def test_unknown_content_encoding(self):
+        with pytest.raises(UnsupportedMessageError, match="сжатие"):
+            decode_message(b"{}", "application/json", "gzip")
+
+    def test_corrupted_zstd_envelope(self):
+        with pytest.raises(UnsupportedMessageError, match="zstd"):
+            decode_message(b"not zstd", "application/json", "zstd")
@@ -0,0 +1,163 @@
+import uuid
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import orjson
+import pytest
+from consumers import ATTEMPTS_HEADER, MicroBatchConsumer, parse_messages
+from dto.message_dto import ProductMessage
+from message_codecs import SCHEMA_VERSION, SCHEMA_VERSION_HEADER
+from sqlalchemy.exc import DataError, OperationalError
+
+
+def make_message(number: int, attempts: int = 0):
+    headers = {ATTEMPTS_HEADER: attempts} if attempts else {}
+    return SimpleNamespace(
+        body=b'{"id": "%d"}' % number,
+        headers=headers,
+        content_type="application/json",
+        content_encoding=None,
+        message_id=f"m{number}",
+        ack=AsyncMock(),
+        nack=AsyncMock(),
+    )
+
+
+class PoisonHandler:
+    """Отвергает любую пачку, в которой есть сообщение poison"""
+
+    def __init__(self, poison=(), error=None):
+        self.poison = set(poison)
+        self.error = error
+        self.written = []
+
+    async def __call__(self, batch):
+        if self.error is not None:
+            raise self.error
+        if any(message.message_id in self.poison for message in batch):
+            raise DataError("INSERT", {}, Exception("numeric field overflow"))
+        self.written.extend(message.message_id for message in batch)
+
+
+def make_consumer(handler, dedup=None):
+    consumer = MicroBatchConsumer(
+        "product", handler, batch_size=8, dedup=dedup, retry_delay=0
+    )
+    consumer._channel = SimpleNamespace(
+        default_exchange=SimpleNamespace(publish=AsyncMock())
+    )
+    return consumer
+
+
+def published(consumer):
+    return [
+        (call.kwargs["routing_key"], call.args[0])
+        for call in consumer._channel.default_exchange.publish.await_args_list
+    ]
+
+
+class TestMicroBatchConsumerFailures:
+    async def test_poison_message_is_isolated(self):
+        handler = PoisonHandler(poison={"m5"})
+        consumer = make_consumer(handler)
+        batch = [make_message(i) for i in range(8)]
+        consumer._buffer = list(batch)
+
+        await consumer.flush()
+
+        assert sorted(handler.written) == sorted(f"m{i}" for i in range(8) if i != 5)
+        [(queue, copy)] = published(consumer)
+        assert queue == "product"
+        assert copy.message_id == "m5"
+        assert copy.headers[ATTEMPTS_HEADER] == 1
+        batch[-1].ack.assert_awaited_once_with(multiple=True)
+        batch[-1].nack.assert_not_called()
+
+    async def test_message_is_dead_lettered_after_max_attempts(self):
+        consumer = make_consumer(PoisonHandler(poison={"m1"}))
+        batch = [make_message(0), make_message(1, attempts=2)]
+        consumer._buffer = list(batch)
+
+        await consumer.flush()
+
+        [(queue, copy)] = published(consumer)
+        assert queue == "product.dead-letter"
+        assert copy.headers[ATTEMPTS_HEADER] == 3
+        assert "numeric field overflow" in copy.headers["x-last-error"]
+        batch[-1].ack.assert_awaited_once_with(multiple=True)
+
+    async def test_transient_error_requeues_whole_batch(self):
+        error = OperationalError("SELECT 1", {}, ConnectionRefusedError())
+        handler = PoisonHandler(error=error)
+        consumer = make_consumer(handler)
+        batch = [make_message(i) for i in range(4)]
+        consumer._buffer = list(batch)
+
+        await consumer.flush()
+
+        assert published(consumer) == []
+        batch[-1].nack.assert_awaited_once_with(multiple=True, requeue=True)
+        batch[-1].ack.assert_not_called()
+
+    async def test_retried_keys_are_released_for_the_copy(self):
+        dedup = MagicMock()
+        dedup.claim = AsyncMock(return_value=({"m0", "m1"}, set()))
+        dedup.confirm = AsyncMock()
+        dedup.release = AsyncMock()
+        consumer = make_consumer(PoisonHandler(poison={"m1"}), dedup=dedup)
+        consumer._buffer = [make_message(0), make_message(1)]
+
+        await consumer.flush()
+
+        dedup.release.assert_awaited_once_with({"m1"})
+        dedup.confirm.assert_awaited_once_with({"m0"})
+
+
+class TestUnsupportedMessages:
+    @pytest.fixture
+    def handler(self):
+        written = []
+
+        async def handle(batch):
+            written.extend(parse_messages(batch, ProductMessage))
+
+        handle.written = written
+        return handle
+
+    def product(self, number: int, **headers):
+        message = make_message(number)
+        message.body = orjson.dumps(
+            {"id": str(uuid.UUID(int=number)), "name": "p", "price": 1}
+        )
+        message.headers.update(headers)
+        return message
+
+    async def test_newer_schema_goes_to_dead_letter(self, handler):
+        consumer = make_consumer(handler)
+        batch = [
+            self.product(0),
+            self.product(1, **{SCHEMA_VERSION_HEADER: SCHEMA_VERSION + 1}),
+            self.product(2),
+        ]
+        consumer._buffer = list(batch)
+
+        await consumer.flush()
+
+        assert handler.written == [uuid.UUID(int=0), uuid.UUID(int=2)]
+        [(queue, copy)] = published(consumer)
+        assert queue == "product.dead-letter"
+        assert copy.message_id == "m1"
+        assert copy.body == batch[1].body
+        assert copy.headers[SCHEMA_VERSION_HEADER] == SCHEMA_VERSION + 1
+        batch[-1].ack.assert_awaited_once_with(multiple=True)
+
+    async def test_unknown_content_type_is_not_retried(self, handler):
+        consumer = make_consumer(handler)
+        message = self.product(0)
+        message.content_type = "application/xml"
+        consumer._buffer = [message]
+
+        await consumer.flush()
+
+        [(queue, _)] = published(consumer)
+        assert queue == "product.dead-letter"
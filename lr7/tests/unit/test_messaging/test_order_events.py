@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import consumers
+import pytest
+from broker import ORDER_EVENTS_QUEUE, broker
+from consumers import decode_event, send_order_emails
+from faststream.rabbit import TestRabbitBroker
+from message_codecs import ZSTD_MIN_SIZE, encode_batch, encode_message
+
+
+def shipped(number: int):
+    return {
+        "event_id": f"e{number}",
+        "event_type": "order.status_changed",
+        "data": {
+            "order_id": f"order-{number}",
+            "status": "shipped",
+            "email": f"user{number}@example.com",
+            "username": f"user{number}",
+            "note": "x" * ZSTD_MIN_SIZE,
+        },
+    }
+
+
+def rabbit_message(encoded):
+    return SimpleNamespace(
+        body=encoded.body,
+        content_type=encoded.content_type,
+        headers=encoded.headers,
+        raw_message=SimpleNamespace(content_encoding=encoded.content_encoding),
+    )
+
+
+@pytest.fixture
+def email_service(monkeypatch):
+    service = SimpleNamespace(send_order_shipped=AsyncMock())
+    monkeypatch.setattr(consumers, "email_service", service)
+    return service
+
+
+class TestOrderEvents:
+    async def test_single_event_is_a_list_of_one(self):
+        encoded = encode_message(shipped(1))
+
+        assert await decode_event(rabbit_message(encoded)) == [shipped(1)]
+
+    async def test_every_event_of_compressed_envelope_is_handled(self, email_service):
+        encoded = encode_batch([shipped(1), shipped(2), shipped(3)])
+        assert encoded.content_encoding == "zstd"
+
+        async with TestRabbitBroker(broker) as test_broker:
+            await test_broker.publish(
+                encoded.body,
+                ORDER_EVENTS_QUEUE,
+                headers=encoded.headers,
+                content_type=encoded.content_type,
+                content_encoding=encoded.content_encoding,
+            )
+
+        sent = [
+            call.kwargs["order_id"]
+            for call in email_service.send_order_shipped.await_args_list
+        ]
+        assert sent == ["order-1", "order-2", "order-3"]
+
+    async def test_other_events_are_skipped(self, email_service):
+        created = {**shipped(1), "event_type": "order.created"}
+        pending = shipped(2)
+        pending["data"]["status"] = "pending"
+
+        await send_order_emails([created, pending])
+
+        email_service.send_order_shipped.assert_not_called()
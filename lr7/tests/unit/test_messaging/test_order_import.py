@@ -0,0 +1,167 @@
+import uuid
+from contextlib import nullcontext
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import consumers
+import orjson
+import pytest
+from consumers import ATTEMPTS_HEADER, MicroBatchConsumer, order_batch_handler
+from message_codecs import encode_batch
+
+
+class FakeStore:
+    """Таблицы в памяти вместо репозиториев, которым нужен PostgreSQL"""
+
+    def __init__(self):
+        self.addresses = {}
+        self.prices = {}
+        self.orders = {}
+
+    async def get_address_owners(self, address_ids):
+        return {
+            aid: self.addresses[aid] for aid in address_ids if aid in self.addresses
+        }
+
+    async def get_prices(self, product_ids):
+        return {pid: self.prices[pid] for pid in product_ids if pid in self.prices}
+
+    async def insert_many(self, orders):
+        inserted = {order["id"] for order in orders if order["id"] not in self.orders}
+        # ON CONFLICT DO NOTHING: существующие заказы не перезаписываются
+        self.orders.update(
+            (order["id"], order) for order in orders if order["id"] in inserted
+        )
+        return inserted
+
+    async def add_items_many(self, items):
+        pass
+
+
+class FakeUnitOfWork:
+    def __init__(self, store):
+        self.orders = self.products = self.users = store
+        self.outbox = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return None
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = FakeStore()
+    monkeypatch.setattr(consumers, "UnitOfWork", lambda session: FakeUnitOfWork(store))
+    return store
+
+
+@pytest.fixture
+def consumer(store):
+    consumer = MicroBatchConsumer(
+        "order", order_batch_handler(lambda: nullcontext()), retry_delay=0
+    )
+    consumer._channel = SimpleNamespace(
+        default_exchange=SimpleNamespace(publish=AsyncMock())
+    )
+    return consumer
+
+
+def make_order(store, product_id):
+    user_id, address_id = uuid.uuid4(), uuid.uuid4()
+    store.addresses[address_id] = user_id
+    return {
+        "id": uuid.uuid4(),
+        "user_id": user_id,
+        "address_id": address_id,
+        "items": [{"product_id": product_id, "quantity": 2}],
+        "created_at": datetime(2024, 1, 1),
+    }
+
+
+def make_message(body, headers=None, message_id="m1"):
+    return SimpleNamespace(
+        body=body,
+        headers=headers or {},
+        content_type="application/json",
+        content_encoding=None,
+        message_id=message_id,
+        ack=AsyncMock(),
+        nack=AsyncMock(),
+    )
+
+
+def redelivered(consumer):
+    """Копия, которую консьюмер отложил, как её снова доставит брокер"""
+    call = consumer._channel.default_exchange.publish.await_args
+    copy = call.args[0]
+    consumer._channel.default_exchange.publish.reset_mock()
+    return call.kwargs["routing_key"], make_message(
+        copy.body, copy.headers, copy.message_id
+    )
+
+
+class TestOrderBeforeProduct:
+    async def test_order_is_retried_until_its_product_arrives(self, consumer, store):
+        product_id = uuid.uuid4()
+        order = make_order(store, product_id)
+        message = make_message(orjson.dumps(order, default=str))
+        consumer._buffer = [message]
+
+        await consumer.flush()
+
+        assert store.orders == {}
+        message.ack.assert_awaited_once_with(multiple=True)
+        queue, copy = redelivered(consumer)
+        assert queue == "order"
+        assert copy.headers[ATTEMPTS_HEADER] == 1
+
+        store.prices[product_id] = Decimal("12.50")
+        consumer._buffer = [copy]
+        await consumer.flush()
+
+        assert store.orders[order["id"]]["total_amount"] == Decimal("25.00")
+        consumer._channel.default_exchange.publish.assert_not_called()
+        copy.ack.assert_awaited_once_with(multiple=True)
+
+    async def test_envelope_is_retried_once_for_its_missing_orders(
+        self, consumer, store
+    ):
+        known, late = uuid.uuid4(), uuid.uuid4()
+        store.prices[known] = Decimal("1.00")
+        orders = [
+            make_order(store, known),
+            make_order(store, late),
+            make_order(store, late),
+        ]
+        encoded = encode_batch(orders)
+        message = make_message(encoded.body, encoded.headers)
+        consumer._buffer = [message]
+
+        await consumer.flush()
+
+        assert set(store.orders) == {orders[0]["id"]}
+        _, copy = redelivered(consumer)
+
+        store.prices[late] = Decimal("2.00")
+        consumer._buffer = [copy]
+        await consumer.flush()
+
+        assert set(store.orders) == {order["id"] for order in orders}
+        consumer._channel.default_exchange.publish.assert_not_called()
+
+    async def test_order_is_dead_lettered_when_product_never_arrives(
+        self, consumer, store
+    ):
+        order = make_order(store, uuid.uuid4())
+        body = orjson.dumps(order, default=str)
+        consumer._buffer = [make_message(body, {ATTEMPTS_HEADER: 2})]
+
+        await consumer.flush()
+
+        queue, copy = redelivered(consumer)
+        assert queue == "order.dead-letter"
+        assert "адрес или товар не найден" in copy.headers["x-last-error"]
@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+
+import pika
+import pytest
+from pika.exceptions import NackError
+from pika_publisher import ConfirmTimeoutError, PikaPublisher, _ConfirmTracker
+
+
+class FakeConnection:
+    """Отвечает на process_data_events заранее заданными confirm-фреймами"""
+
+    def __init__(self):
+        self.tracker = None
+        self.replies = []
+
+    def add_callback_threadsafe(self, callback):
+        pass
+
+    def process_data_events(self, time_limit=0):
+        if self.replies:
+            for method in self.replies.pop(0):
+                self.tracker.on_confirm(SimpleNamespace(method=method))
+
+
+class FakeChannel:
+    def __init__(self):
+        self.published = []
+
+    def queue_declare(self, queue, durable):
+        pass
+
+    def basic_publish(self, exchange, routing_key, body, properties):
+        self.published.append(properties.message_id)
+
+
+@pytest.fixture
+def connection():
+    connection = FakeConnection()
+    connection.tracker = _ConfirmTracker(connection)
+    return connection
+
+
+@pytest.fixture
+def publisher(connection):
+    state = SimpleNamespace(
+        connection=connection,
+        batch_channel=FakeChannel(),
+        confirms=connection.tracker,
+        declared=set(),
+    )
+    publisher = PikaPublisher(pika.ConnectionParameters())
+    publisher._state = lambda: state
+    return publisher
+
+
+def ack(tag, multiple=False):
+    return pika.spec.Basic.Ack(delivery_tag=tag, multiple=multiple)
+
+
+def nack(tag, multiple=False):
+    return pika.spec.Basic.Nack(delivery_tag=tag, multiple=multiple)
+
+
+class TestConfirmTracker:
+    def test_multiple_ack_confirms_all_previous_tags(self, connection):
+        tracker = connection.tracker
+        tags = [tracker.published() for _ in range(3)]
+        connection.replies = [[ack(2, multiple=True)], [nack(3)]]
+
+        assert tracker.wait_for(tags) == {3}
+        assert tracker.unconfirmed == set()
+
+    def test_timeout(self, connection):
+        tag = connection.tracker.published()
+
+        with pytest.raises(ConfirmTimeoutError):
+            connection.tracker.wait_for([tag], timeout=0.01)
+
+
+class TestPublishBatch:
+    MESSAGES = [{"id": str(i), "name": f"Product {i}"} for i in range(3)]
+
+    def test_publishes_batch_before_waiting_for_confirms(self, publisher, connection):
+        connection.replies = [[ack(3, multiple=True)]]
+
+        assert publisher.publish_batch("product", self.MESSAGES) == 3
+        assert len(publisher._state().batch_channel.published) == 3
+
+    def test_nacked_messages_are_published_again(self, publisher, connection):
+        connection.replies = [[ack(1), nack(2), ack(3)], [ack(4)]]
+
+        assert publisher.publish_batch("product", self.MESSAGES) == 3
+        published = publisher._state().batch_channel.published
+        assert len(published) == 4
+        assert published[3] == published[1]
+
+    def test_repeated_nack_raises(self, publisher, connection):
+        connection.replies = [[ack(2, multiple=True), nack(3)], [nack(4)]]
+
+        with pytest.raises(NackError):
+            publisher.publish_batch("product", self.MESSAGES)
@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from models import Order
+from pagination import to_naive
+from repositories.order_repository import OrderRepository
+from services.order_service import OrderService
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from tests.query_counter import QueryCounter, assert_max_queries
+
+INCLUDE_ALL = ["user", "address", "products"]
+
+
+@pytest.fixture
+def order_repository(session):
+    return OrderRepository(session)
+
+
+class TestOrderQueryBudget:
+    """Число запросов листинга не зависит от числа заказов на странице"""
+
+    @pytest.mark.parametrize("count", [1, 10])
+    async def test_listing_with_includes(self, engine, session, orders, count):
+        service = OrderService(OrderRepository(session))
+
+        with assert_max_queries(engine, 2):
+            page, _ = await service.list_orders(count, include=INCLUDE_ALL)
+            items = [
+                (order.user.email, order.address.city, len(order.products))
+                for order in page
+            ]
+
+        assert len(items) == count
+        assert all(products == 2 for _, _, products in items)
+
+    async def test_orders_of_user_with_products(self, engine, order_repository, orders):
+        with assert_max_queries(engine, 2):
+            found = await order_repository.get_by_user_id(
+                orders[0].user_id, include=["products"]
+            )
+            names = {product.name for order in found for product in order.products}
+
+        assert len(found) == 10
+        assert names == {"Product 0", "Product 1"}
+
+    async def test_lazy_loading_per_order_exceeds_budget(
+        self, engine, session, order_repository, orders
+    ):
+        with pytest.raises(AssertionError, match="at most 2 SQL statements"):
+            with assert_max_queries(engine, 2):
+                page, _ = await order_repository.get_by_keyset(5)
+                for order in page:
+                    await session.refresh(order, ["products"])
+
+    async def test_counter_records_statements(self, engine, order_repository, orders):
+        with QueryCounter(engine) as counter:
+            await order_repository.get_by_keyset(5, include=["products"])
+
+        assert counter.count == 2
+        assert "order_products" in counter.statements[1]
+
+
+class TestOrderKeyset:
+    async def test_pages_are_newest_first(self, order_repository, orders):
+        first, cursor = await order_repository.get_by_keyset(4)
+        second, _ = await order_repository.get_by_keyset(4, cursor)
+
+        expected = [order.id for order in reversed(orders)]
+        assert [order.id for order in first + second] == expected[:8]
+
+    @pytest.mark.parametrize("count", [0, -1])
+    async def test_non_positive_count_returns_empty_page(
+        self, order_repository, orders, count
+    ):
+        assert await order_repository.get_by_keyset(count) == ([], None)
+
+    async def test_aware_period_is_compared_as_local_time(
+        self, order_repository, orders
+    ):
+        created_from = orders[2].created_at.astimezone(timezone(timedelta(hours=5)))
+        created_to = orders[5].created_at.astimezone(timezone.utc)
+
+        page, _ = await order_repository.get_by_keyset(
+            20, created_from=created_from, created_to=created_to
+        )
+
+        assert [order.id for order in page] == [o.id for o in orders[4:1:-1]]
+
+    async def test_orders_of_user_are_not_capped(self, session, orders):
+        session.add_all(
+            Order(user_id=orders[0].user_id, address_id=orders[0].address_id)
+            for _ in range(100)
+        )
+        await session.commit()
+        repository = OrderRepository(session)
+
+        assert len(await repository.get_by_user_id(orders[0].user_id)) == 110
+        assert len(await repository.get_by_user_id(orders[0].user_id, limit=5)) == 5
+
+    async def test_orders_without_created_at_are_rejected(self, session, orders):
+        # Строка с NULL в created_at выпала бы из постраничного обхода
+        stmt = insert(Order).values(
+            user_id=orders[0].user_id, address_id=orders[0].address_id
+        )
+
+        with pytest.raises(IntegrityError):
+            await session.execute(stmt.values(created_at=None))
+
+
+def test_to_naive_keeps_naive_values():
+    value = datetime(2024, 1, 1, 12, 0)
+
+    assert to_naive(value) is value
+    assert to_naive(None) is None
+    assert to_naive(value.astimezone()) == value
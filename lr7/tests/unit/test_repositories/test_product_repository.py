@@ -0,0 +1,140 @@
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from broker import PRODUCT_EVENTS_QUEUE
+from db_router import REPLICA_INFO_KEY
+from models import Product
+from repositories.product_repository import ProductRepository
+from sqlalchemy.dialects import postgresql
+
+
+def returned_row(product_id, inserted: bool):
+    return SimpleNamespace(
+        id=product_id,
+        name="Monitor",
+        price=Decimal("349.99"),
+        description=None,
+        stock_quantity=0,
+        available=False,
+        created_at=datetime(2024, 1, 1),
+        inserted=inserted,
+    )
+
+
+class TestUpsertMany:
+    async def test_writes_outbox_events_in_the_same_session(self):
+        created, updated = uuid.uuid4(), uuid.uuid4()
+        session = MagicMock()
+        session.execute = AsyncMock(
+            return_value=[returned_row(created, True), returned_row(updated, False)]
+        )
+        outbox = MagicMock()
+        repository = ProductRepository(session, outbox=outbox)
+
+        rows = [
+            {
+                "id": product_id,
+                "name": "Monitor",
+                "price": Decimal("349.99"),
+                "description": None,
+                "available": False,
+            }
+            for product_id in (created, updated)
+        ]
+        assert await repository.upsert_many(rows) == 2
+
+        sql = str(
+            session.execute.await_args.args[0].compile(dialect=postgresql.dialect())
+        )
+        assert "available = excluded.available" in sql
+        assert "xmax = 0" in sql
+
+        events = [(call.args[0], call.args[2]) for call in outbox.add.call_args_list]
+        assert events == [("product.created", created), ("product.updated", updated)]
+        payload = outbox.add.call_args_list[0].args[3]
+        assert payload["available"] is False
+        assert outbox.add.call_args_list[0].args[4] == PRODUCT_EVENTS_QUEUE
+
+
+class TestReserveStock:
+    async def test_one_conditional_update_over_locked_rows(self):
+        first, second = sorted([uuid.uuid4(), uuid.uuid4()])
+        session = MagicMock()
+        session.execute = AsyncMock(
+            return_value=[
+                SimpleNamespace(
+                    id=first, name="Monitor", price=Decimal("1"), stock_quantity=7
+                )
+            ]
+        )
+        outbox = MagicMock()
+        repository = ProductRepository(session, outbox=outbox)
+
+        reserved = await repository.reserve_stock({second: 1, first: 3})
+
+        compiled = session.execute.await_args.args[0].compile(
+            dialect=postgresql.dialect()
+        )
+        sql = " ".join(str(compiled).split())
+        assert "FOR UPDATE" in sql
+        assert "ORDER BY products.id" in sql
+        assert "unnest(%(product_ids)s" in sql
+        assert "products.stock_quantity >= requested.quantity" in sql
+        # Массивы выровнены: id по порядку блокировки, количества — им в пару
+        assert compiled.params["product_ids"] == [first, second]
+        assert compiled.params["quantities"] == [3, 1]
+
+        assert list(reserved) == [first]
+        [event] = outbox.add.call_args_list
+        assert event.args[:3] == ("product.stock_changed", "product", first)
+        assert event.args[3] == {"id": str(first), "stock_quantity": 7}
+
+    async def test_empty_request_skips_the_query(self):
+        session = MagicMock()
+        session.execute = AsyncMock()
+
+        assert await ProductRepository(session).reserve_stock({}) == {}
+        session.execute.assert_not_called()
+
+
+class TestCacheFill:
+    @pytest.fixture
+    async def product(self, session):
+        product = Product(name="Monitor", price=Decimal("349.99"), stock_quantity=3)
+        session.add(product)
+        await session.commit()
+        return product
+
+    def cache(self):
+        cache = MagicMock()
+        cache.get_product = AsyncMock(return_value=None)
+        cache.get_page = AsyncMock(return_value=None)
+        cache.set_product = AsyncMock()
+        cache.set_page = AsyncMock()
+        return cache
+
+    async def test_primary_reads_fill_cache(self, session, product):
+        cache = self.cache()
+        repository = ProductRepository(session, cache=cache)
+
+        await repository.get_by_id(product.id)
+        await repository.get_paginated(include_total=False)
+
+        cache.set_product.assert_awaited_once()
+        cache.set_page.assert_awaited_once()
+
+    async def test_replica_reads_skip_cache_fill(self, session_factory, product):
+        cache = self.cache()
+        async with session_factory(info={REPLICA_INFO_KEY: True}) as replica:
+            repository = ProductRepository(replica, cache=cache)
+
+            assert (await repository.get_by_id(product.id)).id == product.id
+            page = await repository.get_paginated(include_total=False)
+
+        assert [item.id for item in page["items"]] == [product.id]
+        cache.set_product.assert_not_called()
+        cache.set_page.assert_not_called()
@@ -0,0 +1,53 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from models import User
+from repositories.user_repository import UserRepository
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+
+@pytest.fixture
+async def user_repository(session):
+    start = datetime(2024, 1, 1)
+    session.add_all(
+        User(
+            username=f"user{i}",
+            email=f"user{i}@example.com",
+            created_at=start + timedelta(minutes=i),
+        )
+        for i in range(5)
+    )
+    await session.commit()
+    return UserRepository(session)
+
+
+class TestUserKeyset:
+    async def test_pages_follow_cursor(self, user_repository: UserRepository):
+        first, cursor = await user_repository.get_by_keyset(count=3)
+        second, last_cursor = await user_repository.get_by_keyset(
+            count=3, cursor=cursor
+        )
+
+        assert [row.username for row in first] == ["user0", "user1", "user2"]
+        assert [row.username for row in second] == ["user3", "user4"]
+        assert last_cursor is None
+
+    @pytest.mark.parametrize("count", [0, -1])
+    async def test_non_positive_count_returns_empty_page(
+        self, user_repository: UserRepository, count: int
+    ):
+        users, next_cursor = await user_repository.get_by_keyset(count=count)
+
+        assert users == []
+        assert next_cursor is None
+
+    async def test_users_without_created_at_are_rejected(self, session):
+        # Строка с NULL в created_at выпала бы из постраничного обхода
+        stmt = insert(User).values(
+            id=uuid.uuid4(), username="legacy", email="legacy@example.com"
+        )
+
+        with pytest.raises(IntegrityError):
+            await session.execute(stmt.values(created_at=None))
@@ -0,0 +1,164 @@
+import uuid
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from models import Address, Order, OutboxEvent, Product, User, order_product_association
+from repositories.product_repository import ProductRepository
+from repositories.unit_of_work import UnitOfWork
+from services.order_service import OrderService
+from sqlalchemy import case, select, update
+
+
+class SqliteProductRepository(ProductRepository):
+    """Тот же условный UPDATE ... RETURNING, но без unnest и FOR UPDATE
+
+    SQLite не знает массивов, поэтому количества подставляются через CASE,
+    а = ANY(...) заменяется на IN. Остальная логика reserve_stock (события,
+    инвалидация) — настоящая.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requested = []
+
+    async def get_many(self, product_ids):
+        result = await self.session.execute(
+            select(Product).where(Product.id.in_(product_ids))
+        )
+        return result.scalars().all()
+
+    def _reserve_statement(self, quantities):
+        self.requested.append(dict(quantities))
+        products = Product.__table__
+        quantity = case(quantities, value=products.c.id)
+        return (
+            update(products)
+            .where(products.c.id.in_(list(quantities)))
+            .where(products.c.stock_quantity >= quantity)
+            .values(stock_quantity=products.c.stock_quantity - quantity)
+            .returning(
+                products.c.id,
+                products.c.name,
+                products.c.price,
+                products.c.stock_quantity,
+            )
+        )
+
+
+@pytest.fixture
+async def shop(session):
+    user = User(username="buyer", email="buyer@example.com")
+    address = Address(user=user, street="Main St", city="Moscow", country="RU")
+    keyboard = Product(name="Keyboard", price=Decimal("50.00"), stock_quantity=10)
+    mouse = Product(name="Mouse", price=Decimal("20.00"), stock_quantity=1)
+    session.add_all([address, keyboard, mouse])
+    await session.commit()
+    return user, address, keyboard, mouse
+
+
+@pytest.fixture
+def order_service(session):
+    uow = UnitOfWork(session)
+    uow.products = SqliteProductRepository(session, outbox=uow.outbox)
+    return OrderService(uow.orders, uow.products, uow.users, unit_of_work=uow)
+
+
+def order_data(user, address, *lines):
+    return {
+        "user_id": user.id,
+        "address_id": address.id,
+        "items": [
+            {"product_id": str(product.id), "quantity": quantity}
+            for product, quantity in lines
+        ],
+    }
+
+
+async def stock(session_factory, product_id):
+    async with session_factory() as other:
+        return (await other.get(Product, product_id)).stock_quantity
+
+
+async def events(session_factory):
+    async with session_factory() as other:
+        rows = (await other.execute(select(OutboxEvent))).scalars().all()
+    return sorted((event.event_type, event.aggregate_id) for event in rows)
+
+
+class TestCreateOrder:
+    async def test_duplicate_lines_are_merged(
+        self, order_service, session_factory, shop
+    ):
+        user, address, keyboard, mouse = shop
+
+        order = await order_service.create_order(
+            order_data(user, address, (keyboard, 2), (mouse, 1), (keyboard, 3))
+        )
+
+        assert order_service.product_repository.requested == [
+            {keyboard.id: 5, mouse.id: 1}
+        ]
+        assert order.total_amount == Decimal("270.00")
+        async with session_factory() as other:
+            lines = (
+                await other.execute(
+                    select(
+                        order_product_association.c.product_id,
+                        order_product_association.c.quantity,
+                    ).where(order_product_association.c.order_id == order.id)
+                )
+            ).all()
+        assert sorted(lines) == sorted([(keyboard.id, 5), (mouse.id, 1)])
+        assert await stock(session_factory, keyboard.id) == 5
+        assert await stock(session_factory, mouse.id) == 0
+
+    async def test_insufficient_stock_rolls_back_whole_order(
+        self, order_service, session_factory, shop
+    ):
+        user, address, keyboard, mouse = shop
+        data = order_data(user, address, (keyboard, 2), (mouse, 2))
+        keyboard_id, mouse_id = keyboard.id, mouse.id
+
+        with pytest.raises(ValueError, match="Insufficient stock for product Mouse"):
+            await order_service.create_order(data)
+
+        # Клавиатура успела списаться в том же UPDATE — откат её возвращает
+        assert await stock(session_factory, keyboard_id) == 10
+        assert await stock(session_factory, mouse_id) == 1
+        async with session_factory() as other:
+            assert (await other.execute(select(Order))).scalars().all() == []
+        assert await events(session_factory) == []
+
+    async def test_unknown_product_is_reported(self, order_service, shop):
+        user, address, keyboard, _ = shop
+        missing = SimpleNamespace(id=uuid.uuid4())
+
+        with pytest.raises(ValueError, match=f"Product {missing.id} not found"):
+            await order_service.create_order(
+                order_data(user, address, (keyboard, 1), (missing, 1))
+            )
+
+    async def test_stock_and_order_events_commit_together(
+        self, order_service, session_factory, shop
+    ):
+        user, address, keyboard, mouse = shop
+
+        order = await order_service.create_order(
+            order_data(user, address, (keyboard, 4), (mouse, 1))
+        )
+
+        assert await events(session_factory) == sorted(
+            [
+                ("order.created", order.id),
+                ("product.stock_changed", keyboard.id),
+                ("product.stock_changed", mouse.id),
+            ]
+        )
+        async with session_factory() as other:
+            stock_event = (
+                await other.execute(
+                    select(OutboxEvent).where(OutboxEvent.aggregate_id == keyboard.id)
+                )
+            ).scalar_one()
+        assert stock_event.payload == {"id": str(keyboard.id), "stock_quantity": 6}
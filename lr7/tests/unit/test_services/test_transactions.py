@@ -0,0 +1,60 @@
+import pytest
+from dto.user_dto import UserUpdate
+from models import Address, Order, OutboxEvent, User
+from repositories.order_repository import OrderRepository
+from repositories.user_repository import UserRepository
+from services.order_service import OrderService
+from services.user_service import UserService
+from sqlalchemy import select
+
+
+class TestServicesWithoutUnitOfWork:
+    """Сервис без переданной единицы работы всё равно фиксирует свои записи"""
+
+    async def test_user_service_commits(self, session, session_factory):
+        user = User(username="john", email="john@example.com")
+        session.add(user)
+        await session.commit()
+        service = UserService(UserRepository(session))
+
+        await service.update(user.id, UserUpdate(description="updated"))
+
+        async with session_factory() as other:
+            assert (await other.get(User, user.id)).description == "updated"
+
+    @pytest.fixture
+    async def order(self, session):
+        user = User(username="jane", email="jane@example.com")
+        address = Address(user=user, street="Main St", city="Moscow", country="RU")
+        order = Order(user=user, address=address, status="pending")
+        session.add(order)
+        await session.commit()
+        return order
+
+    async def test_order_service_commits_status_and_event(
+        self, session, session_factory, order
+    ):
+        service = OrderService(OrderRepository(session))
+
+        await service.update_order_status(order.id, "shipped")
+
+        async with session_factory() as other:
+            stored = await other.get(Order, order.id)
+            events = (await other.execute(select(OutboxEvent))).scalars().all()
+        assert stored.status == "shipped"
+        assert [event.event_type for event in events] == ["order.status_changed"]
+        assert events[0].payload["email"] == "jane@example.com"
+
+    async def test_order_service_rolls_back_on_error(
+        self, session, session_factory, order
+    ):
+        order_id = order.id
+        service = OrderService(OrderRepository(session))
+
+        with pytest.raises(ValueError):
+            async with service._transaction():
+                await service.order_repository.update_status(order_id, "cancelled")
+                raise ValueError("boom")
+
+        async with session_factory() as other:
+            assert (await other.get(Order, order_id)).status == "pending"
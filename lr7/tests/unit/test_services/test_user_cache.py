@@ -0,0 +1,81 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from db_router import REPLICA_INFO_KEY
+from dto.user_dto import UserResponse, UserUpdate
+from fakeredis import FakeAsyncRedis
+from models import User
+from redis.exceptions import ConnectionError
+from repositories.user_repository import UserRepository
+from services.user_cache import UserCache
+from services.user_service import UserService
+
+
+@pytest.fixture
+async def redis():
+    redis = FakeAsyncRedis()
+    yield redis
+    await redis.aclose()
+
+
+@pytest.fixture
+async def user(session):
+    user = User(username="john", email="john@example.com", description="original")
+    session.add(user)
+    await session.commit()
+    return user
+
+
+@pytest.fixture
+def user_service(session, redis):
+    return UserService(UserRepository(session), user_cache=UserCache(redis, ttl=60))
+
+
+class TestUserCache:
+    async def test_miss_reads_db_and_fills_cache(self, user_service, redis, user):
+        assert await redis.get(f"user:{user.id}") is None
+
+        found = await user_service.get_by_id(user.id)
+
+        assert found.id == user.id
+        assert await redis.get(f"user:{user.id}") is not None
+        assert 0 < await redis.ttl(f"user:{user.id}") <= 60
+
+    async def test_hit_skips_repository(self, user_service, user):
+        await user_service.get_by_id(user.id)
+        user_service.user_repository = AsyncMock(spec=UserRepository)
+
+        cached = await user_service.get_by_id(user.id)
+
+        assert isinstance(cached, UserResponse)
+        assert cached.description == "original"
+        user_service.user_repository.get_by_id.assert_not_called()
+
+    async def test_update_invalidates(self, user_service, redis, user):
+        await user_service.get_by_id(user.id)
+
+        await user_service.update(user.id, UserUpdate(description="updated"))
+
+        assert await redis.get(f"user:{user.id}") is None
+        assert (await user_service.get_by_id(user.id)).description == "updated"
+
+    async def test_redis_errors_fall_back_to_db(self, session, user):
+        redis = AsyncMock()
+        redis.get.side_effect = ConnectionError("down")
+        redis.set.side_effect = ConnectionError("down")
+        service = UserService(UserRepository(session), user_cache=UserCache(redis))
+
+        found = await service.get_by_id(user.id)
+
+        assert found.id == user.id
+
+    async def test_replica_read_does_not_fill_cache(self, session_factory, redis, user):
+        async with session_factory(info={REPLICA_INFO_KEY: True}) as replica:
+            service = UserService(
+                UserRepository(replica), user_cache=UserCache(redis, ttl=60)
+            )
+
+            found = await service.get_by_id(user.id)
+
+        assert found.id == user.id
+        assert await redis.get(f"user:{user.id}") is None